@@ -0,0 +1,81 @@
+"""
+LLM Response Cache
+------------------
+Persistent cache of extraction results keyed by model and extracted CV text.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.config import Config
+from app.utils import dumps_json, loads_json
+
+
+class LLMResponseCache:
+    """SQLite-backed cache so identical (model, text) pairs skip the LLM call."""
+    
+    # Default entry lifetime in seconds (7 days)
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+    
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        """Open (or create) the cache database."""
+        self.cache_dir = Path(cache_dir or Config.DATA_DIR / "llm_cache")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.cache_dir / "responses.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_ts ON responses (ts)")
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a model and extracted text."""
+        return hashlib.sha256((model + "\x00" + text).encode("utf-8", "ignore")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result, or None if missing or expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, ts FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        response, ts = row
+        if self.ttl and time.time() - ts > self.ttl:
+            return None
+        return loads_json(response)
+    
+    def set(self, key: str, result: Dict[str, Any]):
+        """Store a result under the given key, dropping expired and surplus entries."""
+        response = dumps_json(result, pretty=False)
+        now = int(time.time())
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, ts) VALUES (?, ?, ?)",
+                (key, response, now)
+            )
+            if self.ttl:
+                self._db.execute("DELETE FROM responses WHERE ts < ?", (now - self.ttl,))
+            if self.max_entries:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+    
+    def close(self):
+        """Close the cache database."""
+        with self._lock:
+            self._db.close()
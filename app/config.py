@@ -4,17 +4,21 @@ Configuration Module
 Centralized configuration and environment variable management.
 """
 
+import logging
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Any
 
 # Project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Load environment variables from .env file (dotenv is only imported when one exists)
+if (PROJECT_ROOT / ".env").exists():
+    from dotenv import load_dotenv
+    load_dotenv(PROJECT_ROOT / ".env")
+
 
 class Config:
     """Application configuration."""
@@ -40,12 +44,19 @@ class Config:
     # Web application settings
     HOST = os.getenv("HOST", "127.0.0.1")
     PORT = int(os.getenv("PORT", 5000))
-    DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+    X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "")  # nginx internal location aliased to the upload folder
+    WEB_THREADS = int(os.getenv("WEB_THREADS", 8))  # request threads of the production (waitress) server
+    PRELOAD = os.getenv("PRELOAD", "").lower() in ("1", "true", "yes")  # build extractors at startup, not on first upload
+    
+    # Indent the evaluation report for reading; per-request files are always compact
+    PRETTY_JSON = os.getenv("PRETTY_JSON", "true").lower() in ("1", "true", "yes")
     
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'pdf'}
+    ALLOWED_EXTENSIONS = frozenset({'pdf'})
     
     # AI Model settings
     DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "llama3")
@@ -57,6 +68,10 @@ class Config:
     REQUEST_TIMEOUT = 120  # seconds (increased for complex processing)
     CONNECTION_RETRIES = 3
     CONTEXT_LENGTH = 8192
+    EXTRACTION_TIMEOUT = int(os.getenv("EXTRACTION_TIMEOUT", 300))  # seconds for all models of one upload
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # background upload jobs in the web app
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # seconds a cached LLM result is reused (0 = forever)
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))  # oldest results beyond this are dropped
     
     # Model configurations
     MODELS = {
@@ -91,20 +106,36 @@ class Config:
         }
     }
     
+    # Read-only views so callers cannot mutate the shared model settings
+    MODELS = {name: MappingProxyType(settings) for name, settings in MODELS.items()}
+    
     # Logging configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
     @classmethod
-    def get_model_config(cls, model_name: str) -> Dict[str, Any]:
-        """Get configuration for a specific model."""
+    @lru_cache(maxsize=16)
+    def get_model_config(cls, model_name: str) -> Mapping[str, Any]:
+        """Get (read-only) configuration for a specific model."""
         return cls.MODELS.get(model_name, cls.MODELS[cls.DEFAULT_MODEL])
     
+    # Set once ensure_directories() has created the data directories
+    _dirs_ready = False
+    
+    @classmethod
+    def configure_logging(cls):
+        """Configure root logging from LOG_LEVEL and LOG_FORMAT."""
+        logging.basicConfig(level=cls.LOG_LEVEL.upper(), format=cls.LOG_FORMAT)
+    
     @classmethod
     def ensure_directories(cls):
         """Ensure all required directories exist."""
+        if cls._dirs_ready:
+            return
+        
+        # Every folder lives directly under DATA_DIR, so create it first
+        cls.DATA_DIR.mkdir(parents=True, exist_ok=True)
         directories = [
-            cls.DATA_DIR,
             cls.UPLOAD_FOLDER,
             cls.OUTPUT_FOLDER,
             cls.RESULTS_FOLDER,
@@ -114,7 +145,9 @@ class Config:
         ]
         
         for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
+            directory.mkdir(exist_ok=True)
+        
+        cls._dirs_ready = True
     
     @classmethod
     def validate_config(cls) -> List[str]:
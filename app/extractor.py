@@ -6,12 +6,12 @@ Extract text from PDFs using PyMuPDF and Gemini OCR for scanned documents.
 
 import os
 import fitz  # PyMuPDF - Library for PDF text extraction
-from pdf2image import convert_from_path  # PDF to image conversion
-import google.generativeai as genai  # Gemini API for advanced OCR
-from PIL import Image
 import tempfile
 import time
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# pdf2image and google.generativeai (Gemini OCR) are imported on first use:
+# they are only needed for scanned PDFs and the Gemini SDK alone takes ~0.5s to import
 
 from app.config import Config
 
@@ -37,16 +37,24 @@ class ExtractFromPDF:
         
         if not self.api_key:
             raise ValueError("Google API key is required for Gemini OCR. Set it in your .env file or pass it as a parameter.")
-            
-        # Configure Gemini API with the provided key
-        genai.configure(api_key=self.api_key)
         
-        # Initialize Gemini 1.5 Flash model for OCR
-        self.gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+        # Gemini 1.5 Flash model for OCR, created by the gemini_model property
+        self._gemini_model = None
         
         # Create output directory if provided
         if self.output_folder:
             os.makedirs(self.output_folder, exist_ok=True)
+    
+    @property
+    def gemini_model(self):
+        """Gemini model used for OCR, configured on the first scanned PDF"""
+        if self._gemini_model is None:
+            import google.generativeai as genai  # Gemini API for advanced OCR
+            
+            # Configure Gemini API with the provided key
+            genai.configure(api_key=self.api_key)
+            self._gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+        return self._gemini_model
 
     @staticmethod
     def is_text_based_pdf(pdf_path):
@@ -84,38 +92,79 @@ class ExtractFromPDF:
             print(f"Error extracting text from PDF: {e}")
             return ""
 
+    # Pages checked for selectable text before a PDF is treated as scanned
+    PROBE_PAGES = 3
+    # Fewer characters than this on those pages (e.g. a lone page number) means scanned
+    PROBE_MIN_CHARS = 20
+
+    @staticmethod
+    def open_pdf(pdf):
+        """Open a PDF from a path or from its bytes (an upload kept in memory)"""
+        if isinstance(pdf, (bytes, bytearray)):
+            return fitz.open(stream=pdf, filetype="pdf")
+        return fitz.open(pdf)
+    
+    @classmethod
+    def extract_text_if_text_based(cls, pdf_path):
+        """
+        Extract text from a text-based PDF (path or bytes) in a single pass.
+        Returns "" as soon as the first pages show no selectable text,
+        so scanned PDFs go to OCR without walking every page.
+        """
+        try:
+            with cls.open_pdf(pdf_path) as doc:
+                parts = []
+                found = 0
+                for i, page in enumerate(doc):
+                    text = page.get_text("text")
+                    parts.append(text)
+                    if found < cls.PROBE_MIN_CHARS:
+                        found += len(text.strip())
+                        if i + 1 >= cls.PROBE_PAGES and found < cls.PROBE_MIN_CHARS:
+                            return ""
+                return "".join(parts) if found >= cls.PROBE_MIN_CHARS else ""
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+            return ""
+
+    # Scanned pages sent to Gemini per PDF (API limits), all OCRed concurrently
+    OCR_MAX_PAGES = 3
+    OCR_PROMPT = "Extract all text from this scanned CV page, preserving formatting and structure. Include all detailed information visible in the image."
+    
+    def ocr_page(self, page_image):
+        """Extract the text of one scanned page image with Gemini"""
+        response = self.gemini_model.generate_content([self.OCR_PROMPT, page_image])
+        return response.text.strip()
+    
     def extract_from_scanned_pdf(self, pdf_path):
         """
-        Extract text from a scanned PDF (image-based)
+        Extract text from a scanned PDF (image-based, path or bytes)
         Uses Gemini API as an advanced OCR solution
         """
         try:
-            # Convert PDF to list of images
-            pages = convert_from_path(
+            from pdf2image import convert_from_bytes, convert_from_path  # PDF to image conversion
+            
+            # Convert only the pages that will be OCRed to images
+            convert = convert_from_bytes if isinstance(pdf_path, (bytes, bytearray)) else convert_from_path
+            pages = convert(
                 pdf_path, 
                 poppler_path=self.poppler_path,
                 dpi=300,
-                thread_count=4
+                thread_count=4,
+                last_page=self.OCR_MAX_PAGES
             )
             
-            all_text = ""
+            # Each Gemini call is a network round trip, so OCR the pages in parallel
+            # (configure Gemini first, so worker threads don't race to do it)
+            self.gemini_model
+            with ThreadPoolExecutor(max_workers=max(len(pages), 1)) as executor:
+                page_texts = list(executor.map(self.ocr_page, pages))
             
-            # Process each page with Gemini OCR
-            for i, page_image in enumerate(pages):
-                # Instruction for the Gemini model
-                prompt = "Extract all text from this scanned CV page, preserving formatting and structure. Include all detailed information visible in the image."
-                
-                # Call the Gemini API with the image and prompt
-                response = self.gemini_model.generate_content([prompt, page_image])
-                
-                # Extract and format the text
-                page_text = response.text.strip()
-                all_text += f"\n\n--- Page {i+1} ---\n\n{page_text}"
-                
-                # Process max 3 pages to avoid API limits
-                if i >= 2:
-                    all_text += "\n\n[Additional pages not processed due to API limits]"
-                    break
+            all_text = "".join(f"\n\n--- Page {i+1} ---\n\n{page_text}" for i, page_text in enumerate(page_texts))
+            
+            # Process max 3 pages to avoid API limits
+            if len(pages) >= self.OCR_MAX_PAGES:
+                all_text += "\n\n[Additional pages not processed due to API limits]"
             
             return all_text.strip()
                 
@@ -125,30 +174,47 @@ class ExtractFromPDF:
 
     def extract_text(self, pdf_path):
         """
-        Extract text from a single PDF file.
+        Extract text from a single PDF file (str or path-like).
         Detects type and uses appropriate extraction method.
         """
-        pdf_path = Path(pdf_path)
+        pdf_path = os.fspath(pdf_path)
+        name = os.path.basename(pdf_path)
         
-        if not pdf_path.exists():
+        if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
-        print(f"Processing: {pdf_path.name}")
+        print(f"Processing: {name}")
         
         try:
-            # Determine PDF type and appropriate extraction
-            if self.is_text_based_pdf(str(pdf_path)):
+            # Direct extraction doubles as type detection and stops early on scanned PDFs
+            extracted_text = self.extract_text_if_text_based(pdf_path)
+            if extracted_text:
                 print("  --> Detected as text-based PDF")
-                extracted_text = self.extract_text_from_pdf(str(pdf_path))
             else:
                 print("  --> Detected as image-based PDF")
-                extracted_text = self.extract_from_scanned_pdf(str(pdf_path))
+                extracted_text = self.extract_from_scanned_pdf(pdf_path)
             
             return extracted_text
             
         except Exception as e:
-            print(f"Error processing {pdf_path.name}: {e}")
+            print(f"Error processing {name}: {e}")
             raise
+    
+    def extract_text_from_bytes(self, data, name="upload.pdf"):
+        """
+        Extract text from a PDF held in memory, e.g. an upload that is never saved.
+        Same detection and fallback as extract_text.
+        """
+        print(f"Processing: {name}")
+        
+        extracted_text = self.extract_text_if_text_based(data)
+        if extracted_text:
+            print("  --> Detected as text-based PDF")
+        else:
+            print("  --> Detected as image-based PDF")
+            extracted_text = self.extract_from_scanned_pdf(data)
+        
+        return extracted_text
 
     def process_pdf(self, filename):
         """
@@ -159,10 +225,10 @@ class ExtractFromPDF:
         print(f"\nProcessing: {filename}")
         
         try:
-            # Determine PDF type and appropriate extraction
-            if self.is_text_based_pdf(pdf_path):
+            # Direct extraction doubles as type detection and stops early on scanned PDFs
+            extracted_text = self.extract_text_if_text_based(pdf_path)
+            if extracted_text:
                 print("--> Detected as text-based PDF.")
-                extracted_text = self.extract_text_from_pdf(pdf_path)
             else:
                 print("--> Detected as image-based PDF.")
                 extracted_text = self.extract_from_scanned_pdf(pdf_path)
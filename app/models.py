@@ -5,37 +5,76 @@ Extract structured information from CV text using various LLM models.
 """
 
 import json
-import requests
+import logging
 import time
 import os
 import re
 import hashlib
+import sqlite3
 from pathlib import Path
 import threading
 import concurrent.futures
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 
 from app.config import Config
 
+logger = logging.getLogger(__name__)
 
-class CVInfoExtractor:
-    """Extract structured information from CV text using LLM models."""
+try:
+    import orjson
     
-    def __init__(self):
-        self.config = Config()
-        self.cache_dir = self.config.DATA_DIR / 'cache'
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Model settings
-        self.models = ['llama3:latest', 'phi:latest', 'mistral:latest']
-        self.openrouter_models = [
-            'mistralai/mistral-7b-instruct:free',
-            'shisa-ai/shisa-v2-llama3.3-70b:free',
-            'cognitivecomputations/dolphin3.0-mistral-24b:free'
-        ]
-        
-        # Optimized extraction prompt template for maximum accuracy
-        self.extraction_prompt = """You are a professional CV data extraction specialist. Extract information from this resume with 100% accuracy and completeness.
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj):
+        """Serialize to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj):
+        """Serialize to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# Settings used on every API call, resolved once at import time
+OLLAMA_API_URL = Config.OLLAMA_API_URL
+OPENROUTER_CHAT_URL = f"{Config.OPENROUTER_BASE_URL}/chat/completions"
+REQUEST_TIMEOUT = Config.REQUEST_TIMEOUT
+CONTEXT_LENGTH = Config.CONTEXT_LENGTH
+
+# Field name variations mapped to their (section, personal_info key) target
+_FIELD_MAP = {
+    'name': ('personal_info', 'name'),
+    'fullname': ('personal_info', 'name'),
+    'full_name': ('personal_info', 'name'),
+    'email': ('personal_info', 'email'),
+    'email_address': ('personal_info', 'email'),
+    'phone': ('personal_info', 'phone'),
+    'phone_number': ('personal_info', 'phone'),
+    'address': ('personal_info', 'address'),
+    'location': ('personal_info', 'address'),
+    'personal_info': ('personal_info', None),
+    'education': ('education', None),
+    'educations': ('education', None),
+    'experience': ('experience', None),
+    'work_experience': ('experience', None),
+    'employment': ('experience', None),
+    'skills': ('skills', None),
+    'languages': ('languages', None),
+    'language': ('languages', None),
+}
+
+# Contact details read straight from the CV text when the LLM left them empty
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"\+?\d[\d \-().]{7,}\d")
+# Phone numbers have 9-15 digits; fewer is usually a date range such as "2019 - 2023"
+_PHONE_DIGITS = range(9, 16)
+# Runs of years ("2015 2016 2017") have enough digits too, so without a leading "+"
+# a candidate may contain at most one year-like group
+_YEAR_GROUP_RE = re.compile(r"(?<!\d)(?:19|20)\d\d(?!\d)")
+
+# Optimized extraction prompt template for maximum accuracy, shared by all instances
+_EXTRACTION_PROMPT = """You are a professional CV data extraction specialist. Extract information from this resume with 100% accuracy and completeness.
 
 CRITICAL EXTRACTION RULES:
 1. Extract EXACTLY what is written - do not infer, guess, or paraphrase
@@ -47,28 +86,28 @@ CRITICAL EXTRACTION RULES:
 7. Return ONLY valid JSON - no explanations, markdown, or code blocks
 
 REQUIRED JSON STRUCTURE:
-{{
-"personal_info": {{
+{
+"personal_info": {
     "name": "Complete full name as written on CV",
     "email": "Exact email address with correct domain", 
     "phone": "Complete phone number with all formatting",
     "address": "Full address if mentioned anywhere"
-}},
+},
 "education": [
-    {{
+    {
     "degree": "Complete degree/qualification name exactly as written",
     "institution": "Full institution name without abbreviations",
     "year": "Exact graduation year or date range",
     "description": "Additional details like GPA, honors, relevant coursework"
-    }}
+    }
 ],
 "experience": [
-    {{
+    {
     "job_title": "Complete job title/position exactly as written",
     "company": "Full company/organization name", 
     "duration": "Exact employment period (start-end dates)",
     "description": "Key responsibilities, achievements, and impact"
-    }}
+    }
 ],
 "skills": [
     "List every single skill mentioned",
@@ -80,7 +119,7 @@ REQUIRED JSON STRUCTURE:
     "Preserve exact wording and spelling"
 ],
 "languages": ["Every language mentioned with proficiency level if stated"]
-}}
+}
 
 EXTRACTION PRIORITY:
 - Personal info: Check header, footer, contact sections
@@ -92,142 +131,489 @@ EXTRACTION PRIORITY:
 ACCURACY IS CRITICAL. EXTRACT EVERYTHING. RETURN ONLY JSON.
 
 CV Text:
-{{cv_text}}"""
+{cv_text}"""
+_PROMPT_PREFIX, _, _PROMPT_SUFFIX = _EXTRACTION_PROMPT.partition("{cv_text}")
+
+# Enhanced system message for JSON output, sent ahead of the prompt on OpenRouter
+_OPENROUTER_SYSTEM_MESSAGE = """You are a CV information extractor that outputs ONLY valid JSON.
+                IMPORTANT: Your entire response must be ONLY raw JSON with no markdown formatting, 
+                no code blocks, and no explanatory text."""
+
+
+# Characters that can change _JSONObjectScanner's state, outside and inside strings
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+_JSON_STRING_TOKEN_RE = re.compile(r'["\\]')
+
+
+class _JSONObjectScanner:
+    """Track brace depth across streamed chunks to spot the end of a JSON object."""
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text):
+        """Consume a chunk of text; return True once the first object is closed"""
+        pos = 0
+        if self.escaped and text:
+            # The chunk starts with the character escaped at the end of the last one
+            self.escaped = False
+            pos = 1
+        
+        # Jump straight to the next character that matters instead of visiting every one
+        while True:
+            token_re = _JSON_STRING_TOKEN_RE if self.in_string else _JSON_TOKEN_RE
+            match = token_re.search(text, pos)
+            if match is None:
+                return False
+            char = match.group()
+            pos = match.end()
+            if self.in_string:
+                if char == '\\':
+                    if pos >= len(text):
+                        self.escaped = True
+                        return False
+                    pos += 1
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Quotes only matter once we are inside the object
+                self.in_string = self.depth > 0
+            elif char == '{':
+                self.depth += 1
+            elif char == '}' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+
+
+class CVInfoExtractor:
+    """Extract structured information from CV text using LLM models."""
+    
+    # Maximum number of encoded results kept in the in-memory cache
+    MEM_CACHE_SIZE = 128
+    
+    # Seconds a service health check is trusted for
+    HEALTH_CHECK_TTL = 30
+    
+    # Consecutive Ollama failures before CVs go straight to OpenRouter,
+    # and seconds to wait before giving Ollama another chance
+    OLLAMA_FAILURE_LIMIT = 3
+    OLLAMA_RETRY_AFTER = 300
+    
+    # LLM requests allowed in flight at once, across batch workers and model fan-out;
+    # kept below the session's pool_maxsize so every request gets a pooled connection
+    MAX_CONCURRENT_REQUESTS = 8
+    
+    # Bump whenever the prompt or result format changes so cached results are not reused
+    PROMPT_VERSION = 3
+    
+    # Shared decoder used to pull the first JSON object out of model output
+    _DECODER = json.JSONDecoder()
+    
+    # Default prompt pieces; the extraction_prompt setter overrides them per instance
+    _extraction_prompt = _EXTRACTION_PROMPT
+    _prompt_prefix = _PROMPT_PREFIX
+    _prompt_suffix = _PROMPT_SUFFIX
+    
+    def __init__(self, use_cache=True):
+        self.config = Config()
+        self.cache_dir = self.config.DATA_DIR / 'cache'
+        
+        # False bypasses the result cache entirely (no lookups, no writes)
+        self.use_cache = use_cache
+        
+        # In-memory LRU in front of the SQLite disk cache (opened on first use)
+        self._mem_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._db = None
+        self.cache_stats = {"hits": 0, "misses": 0}
+        
+        # Last health check results as (status, time.monotonic() timestamp)
+        self._ollama_status = (None, 0.0)
+        self._openrouter_status = (None, 0.0)
+        
+        # Circuit breaker state: "ollama", "openrouter" or None before the first CV
+        self._preferred_backend = None
+        self._ollama_failures = 0
+        self._breaker_opened_at = 0.0
+        
+        # Models pulled into the local Ollama server, fetched on first use
+        self._local_models = None
+        
+        # Shared HTTP session, created on first API call (see the session property)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._request_slots = threading.BoundedSemaphore(self.MAX_CONCURRENT_REQUESTS)
+        
+        # Model settings
+        self.models = ['llama3:latest', 'phi:latest', 'mistral:latest']
+        self.openrouter_models = [
+            'mistralai/mistral-7b-instruct:free',
+            'shisa-ai/shisa-v2-llama3.3-70b:free',
+            'cognitivecomputations/dolphin3.0-mistral-24b:free'
+        ]
+    
+    @property
+    def extraction_prompt(self):
+        """Prompt template with a ``{cv_text}`` marker for the CV body"""
+        return self._extraction_prompt
+    
+    @extraction_prompt.setter
+    def extraction_prompt(self, template):
+        # Split once around the marker so each call is a plain concatenation
+        prefix, marker, suffix = template.partition("{cv_text}")
+        if not marker:
+            prefix, suffix = template + "\n\nCV Text:\n", ""
+        self._extraction_prompt = template
+        self._prompt_prefix = prefix
+        self._prompt_suffix = suffix
+    
+    def close(self):
+        """Release the HTTP session and cache database"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        with self._cache_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @property
+    def session(self):
+        """HTTP session so Ollama/OpenRouter calls reuse keep-alive connections"""
+        if self._session is None:
+            # requests is imported lazily so cache-only runs skip its import cost
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
     
     def check_ollama_available(self):
         """Verify Ollama API is running"""
+        import requests
+        
+        now = time.monotonic()
+        available, checked_at = self._ollama_status
+        if available is not None and now - checked_at < self.HEALTH_CHECK_TTL:
+            return available
+        
         try:
-            r = requests.get("http://localhost:11434/api/version", timeout=5)
+            r = self.session.get("http://localhost:11434/api/version", timeout=5)
             r.raise_for_status()
-            print(f"✅ Ollama is running (version: {r.json().get('version', 'unknown')})")
-            return True
+            logger.info("✅ Ollama is running (version: %s)", r.json().get('version', 'unknown'))
+            available = True
         except requests.exceptions.RequestException as e:
-            print(f"❌ Ollama is not available: {e}")
-            return False
+            logger.warning("❌ Ollama is not available: %s", e)
+            available = False
+        
+        self._ollama_status = (available, now)
+        return available
     
     def check_openrouter_available(self):
         """Verify OpenRouter API is available"""
+        import requests
+        
         if not self.config.OPENROUTER_API_KEY:
-            print("❌ OpenRouter API key is not configured")
+            logger.warning("❌ OpenRouter API key is not configured")
             return False
         
+        now = time.monotonic()
+        available, checked_at = self._openrouter_status
+        if available is not None and now - checked_at < self.HEALTH_CHECK_TTL:
+            return available
+        
         try:
-            r = requests.get(
+            r = self.session.get(
                 f"{self.config.OPENROUTER_BASE_URL}/auth/key",
                 headers={"Authorization": f"Bearer {self.config.OPENROUTER_API_KEY}"},
                 timeout=5
             )
             r.raise_for_status()
-            print("✅ OpenRouter API connection successful")
-            return True
+            logger.info("✅ OpenRouter API connection successful")
+            available = True
         except requests.exceptions.RequestException as e:
-            print(f"❌ OpenRouter API is not available: {e}")
-            return False
+            logger.warning("❌ OpenRouter API is not available: %s", e)
+            available = False
+        
+        self._openrouter_status = (available, now)
+        return available
+    
+    def _get_local_models(self, refresh=False):
+        """List models pulled into the local Ollama server"""
+        if self._local_models is not None and not refresh:
+            return self._local_models
+        
+        model_response = self.session.get("http://localhost:11434/api/tags", timeout=5)
+        self._local_models = {m["name"] for m in model_response.json().get("models", [])}
+        return self._local_models
+    
+    def warmup(self):
+        """
+        Open the keep-alive connection and load the local Ollama models into memory,
+        so the first real extraction does not pay for either. Failures are only logged.
+        """
+        try:
+            if not self.check_ollama_available():
+                return
+            local_models = self._get_local_models()
+            for model_name in self.models:
+                if self._has_local_model(model_name, local_models):
+                    # A generate request without a prompt only loads the model
+                    self.session.post(OLLAMA_API_URL, json={"model": model_name}, timeout=self.config.REQUEST_TIMEOUT)
+            logger.info("🔥 Ollama models warmed up")
+        except Exception as e:
+            logger.warning("⚠️ Warm-up failed: %s", e)
+    
+    @staticmethod
+    def _has_local_model(model, local_models):
+        """Check a model name (or its ':latest' tag) against the local model list"""
+        if model in local_models or model.endswith(':latest'):
+            return True
+        return f"{model.split(':')[0]}:latest" in local_models
     
     def get_cache_key(self, cv_text, model):
         """Generate a cache key based on model and CV text"""
-        content = f"{model}:{cv_text}"
-        return hashlib.md5(content.encode()).hexdigest()
+        # Hash incrementally so the CV text is not copied into a new string
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"v{self.PROMPT_VERSION}:{model}".encode())
+        h.update(b":")
+        h.update(cv_text.encode("utf-8", "ignore"))
+        return h.hexdigest()
+    
+    def get_near_duplicate_key(self, cv_text, model):
+        """Cache key shared by CVs that differ only in whitespace, blank lines or case"""
+        # Line order is kept: it pairs each employer with its dates, degree with its school
+        lines = (" ".join(line.split()).casefold() for line in cv_text.splitlines())
+        return self.get_cache_key("\n".join(line for line in lines if line), f"near:{model}")
+    
+    def _remember(self, cache_key, blob):
+        """Store an encoded result in the in-memory LRU cache"""
+        with self._cache_lock:
+            self._mem_cache[cache_key] = blob
+            self._mem_cache.move_to_end(cache_key)
+            if len(self._mem_cache) > self.MEM_CACHE_SIZE:
+                self._mem_cache.popitem(last=False)
+    
+    def _get_db(self):
+        """Open the SQLite cache database; callers must hold the cache lock"""
+        if self._db is None:
+            # Created here rather than in __init__ so extractors that never cache leave no directory
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.cache_dir / "cache.sqlite"), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL)")
+            if "created" not in {row[1] for row in db.execute("PRAGMA table_info(cache)")}:
+                # Databases written by older versions: their entries start aging now
+                with db:
+                    db.execute("ALTER TABLE cache ADD COLUMN created REAL")
+                    db.execute("UPDATE cache SET created = ?", (time.time(),))
+            db.execute("CREATE INDEX IF NOT EXISTS cache_created ON cache (created)")
+            self._db = db
+        return self._db
     
     def get_from_cache(self, cache_key):
         """Get result from cache if available"""
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    print("📂 Using cached result")
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️ Cache error: {e}")
-                return None
-        return None
+        if not self.use_cache:
+            return None
+        
+        # Results are kept encoded and decoded per hit, so callers may modify what they get
+        with self._cache_lock:
+            blob = self._mem_cache.get(cache_key)
+            if blob is not None:
+                self._mem_cache.move_to_end(cache_key)
+                self.cache_stats["hits"] += 1
+        if blob is not None:
+            logger.debug("📂 Using cached result")
+            return _json_loads(blob)
+        
+        ttl = self.config.LLM_CACHE_TTL
+        cutoff = time.time() - ttl if ttl > 0 else 0.0
+        try:
+            with self._cache_lock:
+                row = self._get_db().execute(
+                    "SELECT value FROM cache WHERE key = ? AND created >= ?", (cache_key, cutoff)
+                ).fetchone()
+            
+            if row is None:
+                # Fall back to a JSON file written by older versions
+                cache_file = self.cache_dir / f"{cache_key}.json"
+                if not cache_file.exists():
+                    self._count_cache_lookup(hit=False)
+                    return None
+                with open(cache_file, 'rb') as f:
+                    result = _json_loads(f.read())
+                self.save_to_cache(cache_key, result)
+            else:
+                result = _json_loads(row[0])
+                self._remember(cache_key, row[0])
+            
+            self._count_cache_lookup(hit=True)
+            logger.debug("📂 Using cached result")
+            return result
+        except Exception as e:
+            logger.warning("⚠️ Cache error: %s", e)
+            self._count_cache_lookup(hit=False)
+            return None
     
-    def save_to_cache(self, cache_key, result):
-        """Save result to cache"""
-        cache_file = self.cache_dir / f"{cache_key}.json"
+    def _count_cache_lookup(self, hit):
+        """Record a disk cache hit or miss in cache_stats"""
+        with self._cache_lock:
+            self.cache_stats["hits" if hit else "misses"] += 1
+    
+    def save_to_cache(self, cache_key, result, *extra_keys):
+        """Save result to cache under cache_key and any extra keys, encoding it once"""
+        if not self.use_cache:
+            return
+        
+        # Encode now: later changes to result must not leak into the cache,
+        # and every key decodes its own copy on a hit
+        blob = _json_dumps(result)
+        keys = (cache_key,) + extra_keys
+        for key in keys:
+            self._remember(key, blob)
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-                print("📥 Result cached successfully")
+            with self._cache_lock:
+                db = self._get_db()
+                now = time.time()
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                        [(key, blob, now) for key in keys]
+                    )
+                    # Drop expired entries, then the oldest ones beyond the size limit
+                    if self.config.LLM_CACHE_TTL > 0:
+                        db.execute("DELETE FROM cache WHERE created < ?", (now - self.config.LLM_CACHE_TTL,))
+                    db.execute(
+                        "DELETE FROM cache WHERE key IN "
+                        "(SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.config.LLM_CACHE_MAX_ENTRIES,)
+                    )
+            logger.debug("📥 Result cached successfully")
         except Exception as e:
-            print(f"⚠️ Error saving to cache: {e}")
+            logger.warning("⚠️ Error saving to cache: %s", e)
     
-    def call_ollama_api(self, model, prompt):
-        """Call Ollama API with retry logic"""
-        print(f"🔄 Using Ollama model: {model}")
+    def call_ollama_api(self, model, prompt, cancel=None):
+        """Call Ollama API with retry logic; setting the `cancel` event abandons the request"""
+        import requests
+        
+        logger.info("🔄 Using Ollama model: %s", model)
         
         # Check if model is available
         try:
-            model_response = requests.get(f"http://localhost:11434/api/tags", timeout=5)
-            local_models = [m["name"] for m in model_response.json().get("models", [])]
+            local_models = self._get_local_models()
             
-            if model not in local_models and not model.endswith(':latest'):
-                base_model = model.split(':')[0]
-                if f"{base_model}:latest" not in local_models:
-                    print(f"⚠️ Model '{model}' is not available locally.")
+            # Refresh once on a miss so newly pulled models are picked up
+            if not self._has_local_model(model, local_models):
+                local_models = self._get_local_models(refresh=True)
+                if not self._has_local_model(model, local_models):
+                    logger.warning("⚠️ Model '%s' is not available locally.", model)
                     return None
         except requests.exceptions.RequestException:
-            print("⚠️ Could not check available models. Proceeding anyway.")
+            logger.warning("⚠️ Could not check available models. Proceeding anyway.")
         
         # Prepare payload
         payload = {
             "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
             "options": {
                 "temperature": 0.01,
-                "num_predict": self.config.CONTEXT_LENGTH,
-                "num_ctx": self.config.CONTEXT_LENGTH
+                "num_predict": CONTEXT_LENGTH,
+                "num_ctx": CONTEXT_LENGTH
             }
         }
         
         try:
-            response = requests.post(
-                self.config.OLLAMA_API_URL,
-                json=payload,
-                timeout=self.config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
+            chunks = []
+            scanner = _JSONObjectScanner()
             
-            result = response.json()
-            if 'response' in result:
-                return result['response']
+            # The slot is held until the stream is closed, since that is when the connection is released
+            with self._request_slots:
+                # Another model may have answered while this one waited for a slot
+                if cancel is not None and cancel.is_set():
+                    return None
+                
+                with self.session.post(
+                    OLLAMA_API_URL,
+                    json=payload,
+                    timeout=REQUEST_TIMEOUT,
+                    stream=True
+                ) as response:
+                    if response.status_code == 404:
+                        # Model was removed; force a fresh listing next time
+                        self._local_models = None
+                    response.raise_for_status()
+                    
+                    # Ollama streams one JSON document per line
+                    for line in response.iter_lines():
+                        # Leaving the block closes the stream, which stops generation on the server
+                        if cancel is not None and cancel.is_set():
+                            logger.debug("⏹️ Cancelled %s, another model answered first", model)
+                            return None
+                        if not line:
+                            continue
+                        chunk = _json_loads(line)
+                        if 'response' not in chunk:
+                            continue
+                        chunks.append(chunk['response'])
+                        
+                        # Stop generating as soon as a complete JSON object has arrived
+                        if scanner.feed(chunk['response']) or chunk.get('done'):
+                            break
+            
+            if chunks:
+                return ''.join(chunks)
             else:
-                print(f"⚠️ Unexpected response format from Ollama")
+                logger.warning("⚠️ Unexpected response format from Ollama")
                 return None
                 
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Ollama API error: {e}")
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            logger.warning("⚠️ Ollama API error: %s", e)
             return None
     
     def call_openrouter_api(self, prompt):
         """Call OpenRouter API with fallback models"""
+        import requests
+        
         if not self.config.OPENROUTER_API_KEY:
-            print("❌ OpenRouter API key not configured")
+            logger.error("❌ OpenRouter API key not configured")
             return None
             
-        print("🌐 Falling back to OpenRouter API")
+        logger.info("🌐 Falling back to OpenRouter API")
         
         # Try each OpenRouter model in sequence
         for model in self.openrouter_models:
             try:
-                print(f"🔄 Using OpenRouter model: {model}")
+                logger.info("🔄 Using OpenRouter model: %s", model)
                 
-                # Enhanced system message for JSON output
-                system_message = """You are a CV information extractor that outputs ONLY valid JSON.
-                IMPORTANT: Your entire response must be ONLY raw JSON with no markdown formatting, 
-                no code blocks, and no explanatory text."""
-                
-                # Prepare the payload
+                # Prepare the payload; everything before the CV text is identical across
+                # calls, so providers with prompt caching can reuse the cached prefix
                 payload = {
                     "model": model,
                     "messages": [
-                        {"role": "system", "content": system_message},
+                        {"role": "system", "content": _OPENROUTER_SYSTEM_MESSAGE},
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
                     "max_tokens": 2048,
-                    "response_format": {"type": "json_object"}
+                    "response_format": {"type": "json_object"},
+                    "prompt_cache_key": f"cv-extractor-v{self.PROMPT_VERSION}-{model}"
                 }
                 
                 # Make the API call
@@ -237,35 +623,36 @@ CV Text:
                     "HTTP-Referer": "https://cv-extractor.app"
                 }
                 
-                print(f"📡 Sending request to OpenRouter API...")
-                response = requests.post(
-                    f"{self.config.OPENROUTER_BASE_URL}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=self.config.REQUEST_TIMEOUT
-                )
+                logger.debug("📡 Sending request to OpenRouter API...")
+                with self._request_slots:
+                    response = self.session.post(
+                        OPENROUTER_CHAT_URL,
+                        headers=headers,
+                        json=payload,
+                        timeout=REQUEST_TIMEOUT
+                    )
                 
                 # Check for HTTP errors
                 if response.status_code != 200:
-                    print(f"⚠️ OpenRouter API returned status code {response.status_code}")
+                    logger.warning("⚠️ OpenRouter API returned status code %s", response.status_code)
                     continue
                 
                 # Parse the response
-                response_data = response.json()
+                response_data = _json_loads(response.content)
                 if 'choices' in response_data and len(response_data['choices']) > 0:
                     response_text = response_data['choices'][0]['message']['content']
-                    print(f"✅ OpenRouter API request successful")
+                    logger.info("✅ OpenRouter API request successful")
                     return response_text
                 else:
-                    print(f"⚠️ OpenRouter API returned empty response")
+                    logger.warning("⚠️ OpenRouter API returned empty response")
                     continue
                     
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ OpenRouter API error with model {model}: {e}")
+            except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                logger.warning("⚠️ OpenRouter API error with model %s: %s", model, e)
                 continue
         
         # If we get here, all models failed
-        print(f"❌ All OpenRouter models failed")
+        logger.error("❌ All OpenRouter models failed")
         return None
 
     def extract_json_from_response(self, response: str) -> Dict[str, Any]:
@@ -275,13 +662,12 @@ CV Text:
         
         try:
             # Clean the response to extract JSON
-            print("🔍 Extracting JSON from response...")
+            logger.debug("🔍 Extracting JSON from response...")
             
-            # Find the first opening brace and last closing brace
+            # Find the first opening brace
             first_brace = response.find('{')
-            last_brace = response.rfind('}')
             
-            if first_brace == -1 or last_brace == -1 or first_brace > last_brace:
+            if first_brace == -1:
                 # Try to find code block markers
                 json_start = response.find('```json')
                 json_end = response.rfind('```')
@@ -289,13 +675,16 @@ CV Text:
                 if json_start != -1 and json_end != -1 and json_start < json_end:
                     # Extract JSON from code block
                     json_content = response[json_start + 7:json_end].strip()
-                    parsed_result = json.loads(json_content)
+                    parsed_result = _json_loads(json_content)
                 else:
                     return {"error": "Could not find valid JSON in response"}
             else:
-                # Extract the JSON part
-                json_str = response[first_brace:last_brace + 1]
-                parsed_result = json.loads(json_str)
+                try:
+                    # Usually the whole response is the object: one fast parse
+                    parsed_result = _json_loads(response[first_brace:])
+                except ValueError:
+                    # Decode one object from the first brace, ignoring trailing text
+                    parsed_result, _ = self._DECODER.raw_decode(response, first_brace)
             
             # Normalize the result to expected format
             if isinstance(parsed_result, dict):
@@ -305,13 +694,13 @@ CV Text:
                 return {"error": "Invalid JSON structure"}
             
         except json.JSONDecodeError as e:
-            print(f"❌ JSON parse error: {str(e)}")
+            logger.error("❌ JSON parse error: %s", e)
             return {
                 "error": f"JSON parsing error: {str(e)}",
                 "raw_response": response[:100] + "..." if len(response) > 100 else response
             }
         except Exception as e:
-            print(f"❌ Error extracting JSON: {str(e)}")
+            logger.error("❌ Error extracting JSON: %s", e)
             return {
                 "error": f"JSON extraction error: {str(e)}",
                 "raw_response": response[:100] + "..." if len(response) > 100 else response
@@ -329,82 +718,139 @@ CV Text:
         
         # Handle different field name variations
         for key, value in result.items():
-            key_lower = key.lower()
+            target = _FIELD_MAP.get(key.lower())
+            if target is None:
+                continue
             
-            if key_lower in ['name', 'fullname', 'full_name']:
-                normalized["personal_info"]["name"] = value
-            elif key_lower in ['email', 'email_address']:
-                normalized["personal_info"]["email"] = value
-            elif key_lower in ['phone', 'phone_number']:
-                normalized["personal_info"]["phone"] = value
-            elif key_lower in ['address', 'location']:
-                normalized["personal_info"]["address"] = value
-            elif key_lower == 'personal_info' and isinstance(value, dict):
-                normalized["personal_info"].update(value)
-            elif key_lower in ['education', 'educations']:
-                normalized["education"] = value if isinstance(value, list) else []
-            elif key_lower in ['experience', 'work_experience', 'employment']:
-                normalized["experience"] = value if isinstance(value, list) else []
-            elif key_lower == 'skills':
-                normalized["skills"] = value if isinstance(value, list) else []
-            elif key_lower in ['languages', 'language']:
-                normalized["languages"] = value if isinstance(value, list) else []
+            section, field = target
+            if field is not None:
+                normalized["personal_info"][field] = value
+            elif section == "personal_info":
+                if isinstance(value, dict):
+                    normalized["personal_info"].update(value)
+            else:
+                normalized[section] = value if isinstance(value, list) else []
         
         return normalized
     
+    @staticmethod
+    def _fill_contact_details(result, cv_text):
+        """Set email and phone from the CV text when the model left them empty"""
+        personal_info = result.get("personal_info")
+        if not isinstance(personal_info, dict):
+            return result
+        
+        email = personal_info.get("email")
+        if not (isinstance(email, str) and email.strip()):
+            match = _EMAIL_RE.search(cv_text)
+            if match:
+                personal_info["email"] = match.group()
+        
+        phone = personal_info.get("phone")
+        if not (isinstance(phone, str) and phone.strip()):
+            for match in _PHONE_RE.finditer(cv_text):
+                candidate = match.group()
+                if sum(char.isdigit() for char in candidate) not in _PHONE_DIGITS:
+                    continue
+                if candidate.startswith("+") or len(_YEAR_GROUP_RE.findall(candidate)) < 2:
+                    personal_info["phone"] = candidate
+                    break
+        return result
+    
+    def _try_ollama_model(self, model_name, prompt, cv_text, cancel=None):
+        """Run one Ollama model; return the parsed result or None on failure"""
+        # Check cache first
+        cache_key = self.get_cache_key(cv_text, model_name)
+        cached_result = self.get_from_cache(cache_key)
+        if cached_result:
+            return cached_result
+        
+        logger.info("🔄 Trying model: %s", model_name)
+        
+        try:
+            response = self.call_ollama_api(model_name, prompt, cancel)
+        except Exception as e:
+            logger.warning("⚠️ Model %s failed: %s", model_name, e)
+            return None
+        
+        if not response:
+            return None
+        
+        result = self.extract_json_from_response(response)
+        if "error" in result:
+            logger.warning("⚠️ Model %s gave error: %s", model_name, result.get('error'))
+            return None
+        
+        self._fill_contact_details(result, cv_text)
+        
+        # Cache successful result
+        self.save_to_cache(cache_key, result)
+        return result
+    
     def extract_from_cv(self, cv_text, model=None):
         """Extract structured information from CV text"""
         if model is None:
             model = self.config.DEFAULT_MODEL
         
-        try:
-            # Format prompt with escaped curly braces in cv_text to prevent format errors
-            escaped_cv_text = cv_text.replace("{", "{{").replace("}", "}}")
-            prompt = self.extraction_prompt.format(cv_text=escaped_cv_text)
-        except KeyError as e:
-            print(f"⚠️ Error formatting prompt: {e}")
-            # Fallback approach: manually insert the CV text
-            parts = self.extraction_prompt.split("{cv_text}")
-            if len(parts) == 2:
-                prompt = parts[0] + cv_text + parts[1]
-            else:
-                # Last resort
-                prompt = f"""Extract structured information from this CV as JSON: {cv_text}
-                Return ONLY a valid JSON object with personal_info, education, experience, skills and languages fields."""
+        # A repeated request is answered from the cache before any health check or backend call
+        request_key = self.get_cache_key(cv_text, model)
+        cached_result = self.get_from_cache(request_key)
+        if cached_result:
+            return cached_result
+        
+        # Then a CV that only differs cosmetically from one already extracted
+        near_key = self.get_near_duplicate_key(cv_text, model)
+        cached_result = self.get_from_cache(near_key)
+        if cached_result:
+            self.save_to_cache(request_key, cached_result)
+            return cached_result
+        
+        # Splice the CV text between the precomputed prompt halves
+        prompt = self._prompt_prefix + cv_text + self._prompt_suffix
         
         result = None
         
-        # First try Ollama models
-        ollama_available = self.check_ollama_available()
-        if ollama_available:
-            for model_name in self.models:
-                # Check cache first
-                cache_key = self.get_cache_key(cv_text, model_name)
-                cached_result = self.get_from_cache(cache_key)
-                if cached_result:
-                    return cached_result
-                
-                print(f"\n🔄 Trying model: {model_name}")
-                
-                # Call model
-                response = self.call_ollama_api(model_name, prompt)
-                if response:
-                    result = self.extract_json_from_response(response)
-                    if "error" not in result:
-                        # Cache successful result
-                        self.save_to_cache(cache_key, result)
+        # Skip Ollama while it keeps failing, retrying it after a cool-down
+        skip_ollama = (
+            self._preferred_backend == "openrouter"
+            and time.monotonic() - self._breaker_opened_at < self.OLLAMA_RETRY_AFTER
+        )
+        
+        # First try Ollama models, all at once; the first valid answer wins
+        if not skip_ollama and self.check_ollama_available():
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(self.models))
+            cancel = threading.Event()
+            futures = [executor.submit(self._try_ollama_model, model_name, prompt, cv_text, cancel)
+                       for model_name in self.models]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    result = future.result()
+                    if result is not None:
+                        self._preferred_backend = "ollama"
+                        self._ollama_failures = 0
+                        self.save_to_cache(request_key, result, near_key)
                         return result
-                    else:
-                        print(f"⚠️ Model {model_name} gave error: {result.get('error')}")
-                        continue
+            finally:
+                # Don't wait for slower models once we have an answer: queued ones are dropped
+                # and running ones close their streams and free their request slots
+                cancel.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not skip_ollama:
+            self._ollama_failures += 1
+            if self._ollama_failures >= self.OLLAMA_FAILURE_LIMIT:
+                logger.warning("⚠️ Ollama failed %s times in a row, preferring OpenRouter", self._ollama_failures)
+                self._preferred_backend = "openrouter"
+                self._breaker_opened_at = time.monotonic()
         
         # If Ollama failed, try OpenRouter
-        print("\n🌐 Trying OpenRouter API...")
+        logger.info("🌐 Trying OpenRouter API...")
         if self.check_openrouter_available():
             # Check OpenRouter cache
             cache_key = self.get_cache_key(cv_text, "openrouter")
             cached_result = self.get_from_cache(cache_key)
             if cached_result:
+                self.save_to_cache(request_key, cached_result, near_key)
                 return cached_result
                 
             # Call OpenRouter API
@@ -412,12 +858,14 @@ CV Text:
             if response:
                 result = self.extract_json_from_response(response)
                 if "error" not in result:
+                    self._fill_contact_details(result, cv_text)
+                    
                     # Cache successful result
-                    self.save_to_cache(cache_key, result)
+                    self.save_to_cache(cache_key, result, request_key, near_key)
                     return result
         
         # If all methods failed
-        print("❌ All extraction methods failed")
+        logger.error("❌ All extraction methods failed")
         return {
             "error": "All extraction methods failed",
             "personal_info": {
@@ -431,10 +879,20 @@ CV Text:
             "skills": [],
             "languages": []
         }
+    
+    def extract_from_cv_batch(self, cv_texts, model=None, concurrency=8):
+        """Extract several CVs with up to `concurrency` CVs in progress, preserving order.
+        LLM requests are still capped at MAX_CONCURRENT_REQUESTS across all of them."""
+        if not cv_texts:
+            return []
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(concurrency, len(cv_texts))) as executor:
+            return list(executor.map(lambda cv_text: self.extract_from_cv(cv_text, model), cv_texts))
 
 
 def main():
     """Main function for command line usage."""
+    Config.configure_logging()
     print("🚀 Starting CV Information Extractor")
     
     import argparse
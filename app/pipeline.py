@@ -7,89 +7,217 @@ Core processing pipeline for CV extraction and analysis.
 
 import os
 import sys
-import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
 from app.config import Config
 from app.extractor import ExtractFromPDF
 from app.models import CVInfoExtractor
-from app.utils import ensure_directories, validate_file
+from app.utils import ensure_directories, validate_file, prefetch_files, dumps_json, is_valid_pdf
+
+
+# File suffixes the pipeline can process
+_SUPPORTED_SUFFIXES = frozenset({'.pdf'})
+
+# PDF extractor owned by each worker process of process_directory
+_worker_pdf_extractor = None
+
+
+def extract_text_worker(pdf_path: str) -> str:
+    """Extract text from one PDF inside a worker process."""
+    global _worker_pdf_extractor
+    if _worker_pdf_extractor is None:
+        _worker_pdf_extractor = ExtractFromPDF()
+    return _worker_pdf_extractor.extract_text(pdf_path)
+
+
+# Process-wide pipeline returned by get_pipeline
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> "CVExtractionPipeline":
+    """Return the shared pipeline, so its extractors and caches are set up once per process."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = CVExtractionPipeline()
+        return _pipeline
 
 
 class CVExtractionPipeline:
     """Main pipeline for CV extraction and processing."""
     
-    def __init__(self, config: Optional[Config] = None):
+    # Concurrent LLM requests issued by process_directory
+    LLM_WORKERS = 4
+    
+    # Directories with more PDFs than this are prefetched into the page cache
+    PREFETCH_MIN_FILES = 4
+    
+    def __init__(self, config: Optional[Config] = None, use_cache: bool = True):
         """Initialize the pipeline."""
         self.config = config or Config()
         ensure_directories()
         
         # Initialize components
         self.pdf_extractor = ExtractFromPDF()
-        self.cv_processor = CVInfoExtractor()
+        # use_cache=False makes every CV go to the AI model
+        self.cv_processor = CVInfoExtractor(use_cache=use_cache)
     
     def is_supported_file(self, filename: str) -> bool:
         """Check if file type is supported."""
-        return filename.lower().endswith('.pdf')
+        return os.path.splitext(filename)[1].lower() in _SUPPORTED_SUFFIXES
     
     def process_file(self, file_path: str, model: str = None) -> Dict[str, Any]:
         """Process a single CV file."""
         file_path = Path(file_path)
+        name = file_path.name
         
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        if not self.is_supported_file(file_path.name):
+        if not self.is_supported_file(name):
             raise ValueError(f"Unsupported file type: {file_path.suffix}")
         
+        # Reject renamed non-PDF files before the parser sees them
+        if not is_valid_pdf(file_path):
+            raise ValueError(f"Not a PDF file: {name}")
+        
         # Use default model if not specified
         if model is None:
             model = self.config.DEFAULT_MODEL
         
-        print(f"Processing: {file_path.name}")
+        print(f"Processing: {name}")
         print(f"Using model: {model}")
         
         try:
             # Step 1: Extract text from PDF
             print("  [1/2] Extracting text from PDF...")
-            extracted_text = self.pdf_extractor.extract_text(str(file_path))
-            
-            # Step 2: Process with LLM
+            extracted_text = self.pdf_extractor.extract_text(file_path)
+        except Exception as e:
+            return self._error_result(name, model, e)
+        
+        return self.process_text(name, extracted_text, model)
+    
+    def process_bytes(self, data: bytes, filename: str, model: str = None) -> Dict[str, Any]:
+        """Process a CV held in memory (e.g. an upload), without writing it to disk."""
+        if not self.is_supported_file(filename):
+            raise ValueError(f"Unsupported file type: {Path(filename).suffix}")
+        if not is_valid_pdf(data):
+            raise ValueError(f"Not a PDF file: {filename}")
+        
+        if model is None:
+            model = self.config.DEFAULT_MODEL
+        
+        try:
+            print("  [1/2] Extracting text from PDF...")
+            extracted_text = self.pdf_extractor.extract_text_from_bytes(data, filename)
+        except Exception as e:
+            return self._error_result(filename, model, e)
+        
+        return self.process_text(filename, extracted_text, model)
+    
+    def process_text(self, filename: str, extracted_text: str, model: str) -> Dict[str, Any]:
+        """Run the LLM step on already extracted CV text."""
+        start_time = time.perf_counter()
+        try:
+            # Step 2: Process with LLM (CVInfoExtractor answers repeated texts from its cache)
             print("  [2/2] Processing with AI model...")
             result = self.cv_processor.extract_from_cv(extracted_text, model=model)
             
             # Add metadata
             result['metadata'] = {
-                'filename': file_path.name,
+                'filename': filename,
                 'model_used': model,
-                'processing_status': 'success'
+                'processing_status': 'success',
+                'processing_time': time.perf_counter() - start_time
             }
             
             print("  ✅ Processing complete")
             return result
             
         except Exception as e:
-            error_result = {
-                'error': str(e),
-                'metadata': {
-                    'filename': file_path.name,
-                    'model_used': model,
-                    'processing_status': 'failed'
-                }
+            return self._error_result(filename, model, e)
+    
+    @staticmethod
+    def _error_result(filename: str, model: str, e: Exception) -> Dict[str, Any]:
+        """Build the result returned for a failed file."""
+        error_result = {
+            'error': str(e),
+            'metadata': {
+                'filename': filename,
+                'model_used': model,
+                'processing_status': 'failed'
             }
-            print(f"  ❌ Error: {e}")
-            return error_result
+        }
+        print(f"  ❌ Error: {e}")
+        return error_result
+    
+    def process_files(self, file_paths: List[str], model: str = None,
+                      max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """Process several files with one model, running process_file for each in a thread pool."""
+        file_paths = [str(file_path) for file_path in file_paths]
+        if not file_paths:
+            return {}
+        
+        # The LLM call dominates and releases the GIL while waiting, so threads are enough
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(file_paths))) as executor:
+            futures = {executor.submit(self.process_file, file_path, model): file_path
+                       for file_path in file_paths}
+            results = {}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    results[file_path] = future.result()
+                except Exception as e:
+                    results[file_path] = self._error_result(Path(file_path).name, model, e)
+        
+        # Report in input order
+        return {file_path: results[file_path] for file_path in file_paths}
+    
+    def _extract_texts(self, pdf_files: List[Path], workers: Optional[int]) -> List[Any]:
+        """Extract text from PDFs in worker processes; failures are returned as exceptions."""
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(pdf_files))
+        
+        if workers <= 1:
+            texts = []
+            for pdf_file in pdf_files:
+                try:
+                    texts.append(self.pdf_extractor.extract_text(str(pdf_file)))
+                except Exception as e:
+                    texts.append(e)
+            return texts
+        
+        texts = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(extract_text_worker, str(pdf_file)) for pdf_file in pdf_files]
+            for future in futures:
+                try:
+                    texts.append(future.result())
+                except Exception as e:
+                    texts.append(e)
+        return texts
     
-    def process_directory(self, input_dir: str, models: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    def process_directory(self, input_dir: str, models: List[str] = None,
+                          workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
         """Process all PDF files in a directory."""
         input_dir = Path(input_dir)
         
         if not input_dir.exists():
             raise FileNotFoundError(f"Directory not found: {input_dir}")
         
-        # Get all PDF files
-        pdf_files = list(input_dir.glob("*.pdf"))
+        # Get all PDF files from a single directory scan (same matches as glob("*.pdf"))
+        with os.scandir(input_dir) as entries:
+            pdf_files = [
+                Path(entry.path) for entry in entries
+                if entry.name.endswith(".pdf") and not entry.name.startswith(".") and entry.is_file()
+            ]
         
         if not pdf_files:
             raise ValueError(f"No PDF files found in {input_dir}")
@@ -101,17 +229,49 @@ class CVExtractionPipeline:
         print(f"Found {len(pdf_files)} PDF files in {input_dir}")
         print(f"Using models: {', '.join(models)}")
         
-        all_results = {}
+        return self.process_batch(pdf_files, models, workers)
+    
+    def process_batch(self, pdf_files: List[Path], models: List[str] = None,
+                      workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Process a batch of PDFs with every model, extracting each file's text once.
+        Results are keyed by file name, or by the full path for names shared by several files.
+        """
+        pdf_files = [Path(pdf_file) for pdf_file in pdf_files]
         
-        for model in models:
-            print(f"\n🔄 Processing with model: {model}")
-            model_results = {}
-            
-            for pdf_file in pdf_files:
-                result = self.process_file(str(pdf_file), model)
-                model_results[pdf_file.name] = result
+        if models is None:
+            models = [self.config.DEFAULT_MODEL]
+        
+        name_counts = Counter(pdf_file.name for pdf_file in pdf_files)
+        keys = [pdf_file.name if name_counts[pdf_file.name] == 1 else str(pdf_file) for pdf_file in pdf_files]
+        
+        # Text extraction is CPU bound and model independent: do it once per file in parallel
+        print(f"\n📄 Extracting text from {len(pdf_files)} files...")
+        if len(pdf_files) > self.PREFETCH_MIN_FILES:
+            prefetch_files([str(pdf_file) for pdf_file in pdf_files])
+        texts = self._extract_texts(pdf_files, workers)
+        
+        # LLM calls are I/O bound, so overlap them across files and models
+        with ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
+            futures = {
+                (model, index): executor.submit(self.process_text, pdf_file.name, text, model)
+                for model in models
+                for index, (pdf_file, text) in enumerate(zip(pdf_files, texts))
+                if not isinstance(text, Exception)
+            }
             
-            all_results[model] = model_results
+            all_results = {}
+            for model in models:
+                print(f"\n🔄 Processing with model: {model}")
+                model_results = {}
+                
+                for index, (pdf_file, text) in enumerate(zip(pdf_files, texts)):
+                    if isinstance(text, Exception):
+                        model_results[keys[index]] = self._error_result(pdf_file.name, model, text)
+                    else:
+                        model_results[keys[index]] = futures[model, index].result()
+                
+                all_results[model] = model_results
         
         return all_results
     
@@ -121,14 +281,13 @@ class CVExtractionPipeline:
         output_dir.mkdir(parents=True, exist_ok=True)
         
         output_file = output_dir / filename
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        output_file.write_bytes(dumps_json(results))
         
         print(f"✅ Results saved to: {output_file}")
         return str(output_file)
     
-    def process_and_save(self, input_path: str, output_dir: str = None, models: List[str] = None) -> str:
+    def process_and_save(self, input_path: str, output_dir: str = None, models: List[str] = None,
+                         workers: Optional[int] = None) -> str:
         """Process files and save results."""
         if output_dir is None:
             output_dir = self.config.OUTPUT_FOLDER
@@ -141,7 +300,7 @@ class CVExtractionPipeline:
             filename = f"{input_path.stem}_result.json"
         else:
             # Process directory
-            result = self.process_directory(str(input_path), models)
+            result = self.process_directory(str(input_path), models, workers)
             filename = "batch_results.json"
         
         return self.save_results(result, output_dir, filename)
@@ -156,18 +315,23 @@ def main():
     parser.add_argument("--output", "-o", help="Output directory")
     parser.add_argument("--models", "-m", nargs="+", default=["llama3"],
                        help="Models to use for processing")
+    parser.add_argument("--workers", "-w", type=int,
+                       help="Worker processes for PDF text extraction (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Always call the AI model instead of reusing cached responses")
     
     args = parser.parse_args()
     
     # Initialize pipeline
-    pipeline = CVExtractionPipeline()
+    pipeline = CVExtractionPipeline(use_cache=not args.no_cache)
     
     try:
         # Process and save
         output_file = pipeline.process_and_save(
             args.input, 
             args.output, 
-            args.models
+            args.models,
+            args.workers
         )
         
         print(f"\n✅ Pipeline completed successfully!")
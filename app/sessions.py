@@ -0,0 +1,153 @@
+"""
+Session Store
+-------------
+SQLite-backed storage for web upload sessions and their job status.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from app.config import Config
+from app.utils import dumps_json, loads_json
+
+
+class SessionStore:
+    """One indexed row per upload session instead of one JSON file per session."""
+    
+    # Completed sessions kept parsed in memory (they never change once done)
+    MEM_CACHE_SIZE = 256
+    
+    # File name suffix of the per-session JSON files written by older versions
+    LEGACY_FILE_SUFFIX = "_session.json"
+    
+    def __init__(self, results_dir: Optional[Path] = None):
+        """Open (or create) the sessions database."""
+        self.results_dir = Path(results_dir or Config.RESULTS_FOLDER)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._mem_cache = OrderedDict()
+        self._db = sqlite3.connect(str(self.results_dir / "sessions.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, status TEXT, error TEXT, data BLOB, created REAL, updated REAL)"
+        )
+        self.import_legacy_files()
+    
+    def import_legacy_files(self) -> int:
+        """Move sessions from older versions' <id>_session.json files into the database."""
+        imported = 0
+        for session_file in self.results_dir.glob(f"*{self.LEGACY_FILE_SUFFIX}"):
+            session_id = session_file.name[:-len(self.LEGACY_FILE_SUFFIX)]
+            try:
+                data = loads_json(session_file.read_bytes())
+                mtime = session_file.stat().st_mtime
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not import session file {session_file.name}: {e}")
+                continue
+            
+            # Sessions already in the database win; the file's age carries over for expiry
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO sessions (session_id, status, error, data, created, updated) "
+                    "VALUES (?, 'done', NULL, ?, ?, ?)",
+                    (session_id, dumps_json(data, pretty=False), mtime, mtime)
+                )
+            session_file.unlink(missing_ok=True)
+            imported += 1
+        return imported
+    
+    def set_status(self, session_id: str, status: str, error: Optional[str] = None):
+        """Record a job status: pending, done or error."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, status, error, created, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET status = excluded.status, error = excluded.error, "
+                "updated = excluded.updated",
+                (session_id, status, error, now, now)
+            )
+    
+    def get_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job status of a session, or None if it is unknown."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, error FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        status, error = row
+        return {'status': status, 'error': error} if error else {'status': status}
+    
+    def save(self, session_id: str, data: Dict[str, Any]):
+        """Store a completed session and mark its job done in one write."""
+        blob = dumps_json(data, pretty=False)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, status, error, data, created, updated) "
+                "VALUES (?, 'done', NULL, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET status = 'done', error = NULL, data = excluded.data, "
+                "updated = excluded.updated",
+                (session_id, blob, now, now)
+            )
+            self._mem_cache.pop(session_id, None)
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a completed session's data, or None if it has none yet."""
+        with self._lock:
+            data = self._mem_cache.get(session_id)
+            if data is not None:
+                self._mem_cache.move_to_end(session_id)
+                return data
+            
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND data IS NOT NULL", (session_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        data = loads_json(row[0])
+        with self._lock:
+            self._mem_cache[session_id] = data
+            self._mem_cache.move_to_end(session_id)
+            while len(self._mem_cache) > self.MEM_CACHE_SIZE:
+                self._mem_cache.popitem(last=False)
+        return data
+    
+    def fail_pending(self, error: str) -> int:
+        """Mark every pending job as failed; returns the number of jobs marked."""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE sessions SET status = 'error', error = ?, updated = ? WHERE status = 'pending'",
+                (error, time.time())
+            )
+        return cursor.rowcount
+    
+    def iter_sessions(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (session_id, data) for every completed session."""
+        with self._lock:
+            rows = self._db.execute("SELECT session_id, data FROM sessions WHERE data IS NOT NULL").fetchall()
+        
+        for session_id, blob in rows:
+            yield session_id, loads_json(blob)
+    
+    def delete_older_than(self, max_age: float) -> int:
+        """Remove sessions not updated within max_age seconds; returns the number removed."""
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - max_age,))
+            self._mem_cache.clear()
+        return cursor.rowcount
+    
+    def close(self):
+        """Close the sessions database."""
+        with self._lock:
+            self._db.close()
@@ -3,15 +3,47 @@ Utility functions for CV Extractor
 """
 
 import os
+import re
 import json
+import time
+import datetime
+import platform
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import hashlib
+import mmap
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from app.config import Config
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Characters not allowed in file names
+_UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+
+# PDF signature; readers accept it anywhere in the first 1024 bytes
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
+
+# Bytes read per call when hashing files
+HASH_CHUNK_SIZE = 1 << 20
+
+# Control characters (except tab, newline and carriage return) removed by sanitize_text
+_CONTROL_CHARS = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), *range(0x7f, 0xa0)]
+)
+
 
 def ensure_directories():
     """Create necessary directories if they don't exist."""
@@ -25,22 +57,144 @@ def validate_file(file_path: str, allowed_extensions: set = None) -> bool:
     
     file_path = Path(file_path)
     
-    if not file_path.exists():
-        return False
-    
-    if file_path.suffix.lower().lstrip('.') not in allowed_extensions:
-        return False
-    
-    return True
-
-
-def get_file_hash(file_path: str) -> str:
-    """Generate MD5 hash of a file."""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    # Check the (cheap) extension before touching the filesystem
+    return file_path.suffix[1:].lower() in allowed_extensions and file_path.is_file()
+
+
+def is_valid_pdf(source) -> bool:
+    """
+    Check for the %PDF header without parsing the file.
+    Accepts a path, the file's bytes, or a seekable file object (left at its original position).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:PDF_HEADER_WINDOW])
+    elif hasattr(source, "read"):
+        position = source.tell()
+        head = source.read(PDF_HEADER_WINDOW)
+        source.seek(position)
+    else:
+        try:
+            with open(source, "rb") as f:
+                head = f.read(PDF_HEADER_WINDOW)
+        except OSError:
+            return False
+    return PDF_MAGIC in head
+
+
+def _new_hasher(algo: str):
+    """Hasher for algo: "blake3" (MD5 when blake3 is not installed) or any hashlib algorithm name."""
+    if algo == "blake3":
+        return blake3.blake3() if blake3 is not None else hashlib.md5()
+    try:
+        return hashlib.new(algo)
+    except ValueError:
+        raise ValueError(f"Unsupported hash algorithm: {algo}") from None
+
+
+def get_file_hash(file_path: str, algo: str = "blake3") -> str:
+    """Generate a hash of a file (BLAKE3 by default); raises ValueError for unknown algorithms."""
+    hasher = _new_hasher(algo)
+    
+    with open(file_path, "rb", buffering=0) as f:
+        # Hash straight from the page cache when the file can be memory-mapped
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                hasher.update(mm)
+            return hasher.hexdigest()
+        except (ValueError, OSError):
+            # Empty files and some filesystems cannot be mapped
+            pass
+        
+        # Read into one reusable buffer instead of allocating a new chunk per read
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            hasher.update(view[:size])
+    return hasher.hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _cached_file_hash(file_path: str, mtime_ns: int, size: int) -> str:
+    """Hash a file; mtime and size are part of the key so a changed file is hashed again."""
+    return get_file_hash(file_path)
+
+
+def get_bytes_hash(data: bytes, algo: str = "blake3") -> str:
+    """Hash in-memory file contents the same way get_file_hash hashes a file."""
+    hasher = _new_hasher(algo)
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def get_file_hash_cached(file_path: str) -> str:
+    """Like get_file_hash, but a file that has not changed since its last hash is not read again."""
+    file_path = os.fspath(file_path)
+    stat = os.stat(file_path)
+    return _cached_file_hash(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+def prefetch_files(file_paths: List[str]) -> int:
+    """Ask the kernel to start reading files into the page cache in the background."""
+    if not hasattr(os, "posix_fadvise"):
+        return 0
+    
+    prefetched = 0
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            prefetched += 1
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    return prefetched
+
+
+def dumps_json(data: Any, pretty: bool = True) -> bytes:
+    """Serialize data to UTF-8 JSON bytes, indented unless pretty is False (orjson when available)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads_json(data: bytes) -> Any:
+    """Parse JSON bytes or text (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def atomic_write_json(file_path, data: Any, pretty: bool = False):
+    """
+    Write JSON to a temp file in the target directory, then rename it into place.
+    Readers see either the old file or the complete new one, never a partial write.
+    """
+    file_path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps_json(data, pretty=pretty))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 def save_json(data: Dict[str, Any], file_path: str) -> bool:
@@ -49,8 +203,7 @@ def save_json(data: Dict[str, Any], file_path: str) -> bool:
         file_path = Path(file_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        atomic_write_json(file_path, data, pretty=True)
         
         return True
     except Exception as e:
@@ -61,8 +214,7 @@ def save_json(data: Dict[str, Any], file_path: str) -> bool:
 def load_json(file_path: str) -> Dict[str, Any]:
     """Load data from JSON file."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return loads_json(Path(file_path).read_bytes())
     except Exception as e:
         print(f"Error loading JSON: {e}")
         return {}
@@ -70,8 +222,6 @@ def load_json(file_path: str) -> Dict[str, Any]:
 
 def clean_temp_files(directory: str, max_age_hours: int = 24):
     """Clean temporary files older than specified hours."""
-    import time
-    
     directory = Path(directory)
     if not directory.exists():
         return
@@ -79,15 +229,26 @@ def clean_temp_files(directory: str, max_age_hours: int = 24):
     current_time = time.time()
     max_age_seconds = max_age_hours * 3600
     
-    for file_path in directory.iterdir():
-        if file_path.is_file():
-            file_age = current_time - file_path.stat().st_mtime
-            if file_age > max_age_seconds:
-                try:
-                    file_path.unlink()
-                    print(f"Cleaned temp file: {file_path.name}")
-                except Exception as e:
-                    print(f"Error cleaning {file_path.name}: {e}")
+    # scandir entries avoid building a Path per file
+    with os.scandir(directory) as entries:
+        stale = [
+            entry for entry in entries
+            if entry.is_file() and current_time - entry.stat().st_mtime > max_age_seconds
+        ]
+    
+    if not stale:
+        return
+    
+    def remove(entry):
+        try:
+            os.unlink(entry.path)
+            print(f"Cleaned temp file: {entry.name}")
+        except Exception as e:
+            print(f"Error cleaning {entry.name}: {e}")
+    
+    # Unlinks are I/O bound, so issue them in parallel
+    with ThreadPoolExecutor(max_workers=min(32, len(stale))) as executor:
+        list(executor.map(remove, stale))
 
 
 def format_file_size(size_bytes: int) -> str:
@@ -106,10 +267,8 @@ def format_file_size(size_bytes: int) -> str:
 
 def create_safe_filename(filename: str) -> str:
     """Create a safe filename by removing/replacing invalid characters."""
-    import re
-    
     # Remove or replace invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = _UNSAFE_FILENAME_CHARS.sub('_', filename)
     
     # Remove leading/trailing spaces and dots
     filename = filename.strip(' .')
@@ -123,22 +282,36 @@ def create_safe_filename(filename: str) -> str:
 
 def get_unique_filename(directory: str, filename: str) -> str:
     """Get a unique filename by adding numbers if file exists."""
-    directory = Path(directory)
-    file_path = directory / filename
+    # One directory listing instead of a stat() per candidate name
+    try:
+        with os.scandir(directory) as entries:
+            existing = {entry.name for entry in entries}
+    except FileNotFoundError:
+        return filename
     
-    if not file_path.exists():
+    if filename not in existing:
         return filename
     
+    file_path = Path(filename)
     name_part = file_path.stem
     extension = file_path.suffix
     counter = 1
     
-    while file_path.exists():
-        new_filename = f"{name_part}_{counter}{extension}"
-        file_path = directory / new_filename
+    while f"{name_part}_{counter}{extension}" in existing:
         counter += 1
     
-    return file_path.name
+    return f"{name_part}_{counter}{extension}"
+
+
+def _copy_file_range(source: Path, destination: Path):
+    """Copy file contents inside the kernel with copy_file_range (Linux)."""
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
 
 
 def copy_file_safely(source: str, destination: str) -> bool:
@@ -150,8 +323,16 @@ def copy_file_safely(source: str, destination: str) -> bool:
         # Create destination directory if needed
         dest_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Copy file
-        shutil.copy2(source_path, dest_path)
+        # Copy contents only; callers don't need the metadata copy2 preserves
+        if hasattr(os, "copy_file_range"):
+            try:
+                _copy_file_range(source_path, dest_path)
+                return True
+            except OSError:
+                # Fall through, e.g. for filesystems without copy_file_range support
+                pass
+        
+        shutil.copyfile(source_path, dest_path)
         return True
         
     except Exception as e:
@@ -172,24 +353,18 @@ def validate_json_structure(data: Dict[str, Any], required_fields: List[str]) ->
 
 def sanitize_text(text: str) -> str:
     """Sanitize text by removing unwanted characters."""
-    import re
-    
     if not text:
         return ""
     
     # Remove control characters except newlines and tabs
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
+    text = text.translate(_CONTROL_CHARS)
     
     # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
+    return " ".join(text.split())
 
 
 def create_backup(file_path: str, backup_dir: str = None) -> str:
     """Create a backup of a file."""
-    import datetime
-    
     file_path = Path(file_path)
     
     if backup_dir is None:
@@ -213,36 +388,73 @@ def create_backup(file_path: str, backup_dir: str = None) -> str:
 
 def log_processing_stats(stats: Dict[str, Any], log_file: str = None):
     """Log processing statistics."""
-    import datetime
-    
     if log_file is None:
-        log_file = Config.DATA_DIR / "processing_log.json"
+        log_file = Config.DATA_DIR / "processing_log.jsonl"
     
     log_entry = {
         "timestamp": datetime.datetime.now().isoformat(),
         "stats": stats
     }
     
-    # Load existing log
-    log_data = []
-    if Path(log_file).exists():
-        log_data = load_json(log_file)
-        if not isinstance(log_data, list):
-            log_data = []
+    # Append one JSON line instead of rewriting the whole log
+    if orjson is not None:
+        line = orjson.dumps(log_entry, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    else:
+        line = json.dumps(log_entry, ensure_ascii=False)
+    
+    log_file = Path(log_file)
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+        size = f.tell()
+    
+    compact_log(log_file, size=size)
+
+
+# Log file -> size it must reach before compact_log reads it again
+_log_compact_at = {}
+
+
+def compact_log(log_file: str, keep: int = 100, size: Optional[int] = None) -> bool:
+    """
+    Trim a JSONL log to its last `keep` entries once it grows past twice that.
+    The file is only read once its size suggests it passed that limit (entries
+    are assumed to stay about the same size), so calling this on every append
+    costs O(1) amortized.
+    """
+    log_file = Path(log_file)
+    if size is None:
+        try:
+            size = os.stat(log_file).st_size
+        except FileNotFoundError:
+            return False
+    if size < _log_compact_at.get(log_file, 0):
+        return False
     
-    # Add new entry
-    log_data.append(log_entry)
+    try:
+        with open(log_file, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return False
     
-    # Keep only last 100 entries
-    log_data = log_data[-100:]
+    # Next read once the file should hold more than 2 * keep lines of this average size
+    if len(lines) <= 2 * keep:
+        _log_compact_at[log_file] = size * (2 * keep + 1) // max(len(lines), 1)
+        return False
     
-    # Save updated log
-    save_json(log_data, log_file)
+    # Write to a temp file first so readers never see a half-written log
+    temp_file = log_file.with_suffix(log_file.suffix + '.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.writelines(lines[-keep:])
+        kept_size = f.tell()
+    os.replace(temp_file, log_file)
+    _log_compact_at[log_file] = kept_size * (2 * keep + 1) // keep
+    return True
 
 
 def get_system_info() -> Dict[str, Any]:
     """Get system information for debugging."""
-    import platform
+    # psutil is only needed here, so it is imported on demand
     import psutil
     
     return {
@@ -2,17 +2,17 @@
 Evaluation module for CV Extractor models
 """
 
-import json
 import os
+import time
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, FrozenSet, List, Any
 from dataclasses import dataclass
 
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import numpy as np
 
 from app.pipeline import CVExtractionPipeline
+from app.config import Config
+from app.utils import atomic_write_json, loads_json
 from evaluation.metrics import EvaluationMetrics
 
 
@@ -32,39 +32,62 @@ class EvaluationResult:
 class CVEvaluator:
     """Evaluates CV extraction models against ground truth data."""
     
+    # CVs extracted together by evaluate_dataset
+    BATCH_SIZE = 16
+    
     def __init__(self, ground_truth_dir: str = "data/ground_truth"):
         self.ground_truth_dir = Path(ground_truth_dir)
         self.pipeline = CVExtractionPipeline()
         self.metrics = EvaluationMetrics()
         
+        # Ground-truth field sets per CV, shared by every model evaluated on it
+        self._gt_field_sets = {}
+        
     def load_ground_truth(self, filename: str) -> Dict[str, Any]:
         """Load ground truth data for a CV."""
         gt_file = self.ground_truth_dir / f"{filename}.json"
         if not gt_file.exists():
             raise FileNotFoundError(f"Ground truth file not found: {gt_file}")
             
-        with open(gt_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return loads_json(gt_file.read_bytes())
+    
+    def load_ground_truth_field_sets(self, filename: str) -> Dict[str, FrozenSet[str]]:
+        """Load ground truth for a CV as per-field text sets (cached)."""
+        field_sets = self._gt_field_sets.get(filename)
+        if field_sets is None:
+            field_sets = self.metrics.field_sets(self.load_ground_truth(filename))
+            self._gt_field_sets[filename] = field_sets
+        return field_sets
     
     def evaluate_single_cv(self, cv_path: str, model: str = "llama3") -> EvaluationResult:
         """Evaluate extraction for a single CV."""
-        import time
-        
         filename = Path(cv_path).stem
         
         try:
-            # Load ground truth
-            ground_truth = self.load_ground_truth(filename)
+            # Load ground truth first so a missing file skips the extraction
+            self.load_ground_truth_field_sets(filename)
             
             # Extract data using model
             start_time = time.time()
             extracted_data = self.pipeline.process_file(cv_path, model=model)
             extraction_time = time.time() - start_time
+        except Exception as e:
+            return self._failed_result(filename, model, e)
+        
+        return self.score_extraction(filename, model, extracted_data, extraction_time)
+    
+    def score_extraction(self, filename: str, model: str, extracted_data: Dict[str, Any],
+                         extraction_time: float) -> EvaluationResult:
+        """Score already extracted data against the CV's ground truth."""
+        try:
+            # Load ground truth (traversed once per CV, not once per model)
+            gt_sets = self.load_ground_truth_field_sets(filename)
             
             # Calculate metrics
-            accuracy = self.metrics.calculate_accuracy(extracted_data, ground_truth)
-            precision = self.metrics.calculate_precision(extracted_data, ground_truth)
-            recall = self.metrics.calculate_recall(extracted_data, ground_truth)
+            scores = self.metrics.score_field_sets(self.metrics.field_sets(extracted_data), gt_sets)
+            accuracy = scores["accuracy"]
+            precision = scores["precision"]
+            recall = scores["recall"]
             f1_score = self.metrics.calculate_f1_score(precision, recall)
             
             return EvaluationResult(
@@ -79,39 +102,63 @@ class CVEvaluator:
             )
             
         except Exception as e:
-            return EvaluationResult(
-                filename=filename,
-                model=model,
-                accuracy=0.0,
-                precision=0.0,
-                recall=0.0,
-                f1_score=0.0,
-                extraction_time=0.0,
-                errors=[str(e)]
-            )
+            return self._failed_result(filename, model, e)
+    
+    @staticmethod
+    def _failed_result(filename: str, model: str, e: Exception) -> EvaluationResult:
+        """Build the result recorded for a CV that could not be evaluated."""
+        return EvaluationResult(
+            filename=filename,
+            model=model,
+            accuracy=0.0,
+            precision=0.0,
+            recall=0.0,
+            f1_score=0.0,
+            extraction_time=0.0,
+            errors=[str(e)]
+        )
     
-    def evaluate_dataset(self, cv_dir: str, models: List[str] = None) -> Dict[str, List[EvaluationResult]]:
+    def evaluate_dataset(self, cv_dir: str, models: List[str] = None, workers: int = None,
+                         batch_size: int = BATCH_SIZE) -> Dict[str, List[EvaluationResult]]:
         """Evaluate multiple CVs with multiple models."""
         if models is None:
             models = ["llama3", "mistral", "phi"]
             
         cv_dir = Path(cv_dir)
-        results = {model: [] for model in models}
         
         # Get all PDF files
         pdf_files = list(cv_dir.glob("*.pdf"))
         
         print(f"Evaluating {len(pdf_files)} CVs with {len(models)} models...")
         
+        # CVs without ground truth cannot be scored: record them as failed without extracting them
+        scored = {}
+        scorable = []
         for pdf_file in pdf_files:
-            print(f"Processing: {pdf_file.name}")
+            try:
+                self.load_ground_truth_field_sets(pdf_file.stem)
+                scorable.append(pdf_file)
+            except Exception as e:
+                for model in models:
+                    scored[model, pdf_file.name] = self._failed_result(pdf_file.stem, model, e)
+        
+        # Each batch extracts every CV's text once and runs the LLM calls for all models concurrently
+        for start in range(0, len(scorable), batch_size):
+            batch = scorable[start:start + batch_size]
+            print(f"Processing CVs {start + 1}-{start + len(batch)} of {len(scorable)}")
+            
+            batch_results = self.pipeline.process_batch(batch, models, workers)
             
             for model in models:
-                print(f"  - Using model: {model}")
-                result = self.evaluate_single_cv(str(pdf_file), model)
-                results[model].append(result)
+                for pdf_file in batch:
+                    extracted_data = batch_results[model][pdf_file.name]
+                    # Measured around this CV's own LLM step (0 if its text could not be extracted)
+                    extraction_time = extracted_data.get('metadata', {}).get('processing_time', 0.0)
+                    scored[model, pdf_file.name] = self.score_extraction(
+                        pdf_file.stem, model, extracted_data, extraction_time)
         
-        return results
+        # Report CVs in directory order
+        return {model: [scored[model, pdf_file.name] for pdf_file in pdf_files] for model in models}
     
     def generate_report(self, results: Dict[str, List[EvaluationResult]]) -> Dict[str, Any]:
         """Generate evaluation report."""
@@ -126,21 +173,24 @@ class CVEvaluator:
             if not model_results:
                 continue
                 
-            accuracies = [r.accuracy for r in model_results if not r.errors]
-            precisions = [r.precision for r in model_results if not r.errors]
-            recalls = [r.recall for r in model_results if not r.errors]
-            f1_scores = [r.f1_score for r in model_results if not r.errors]
-            times = [r.extraction_time for r in model_results if not r.errors]
+            # One row per successful CV: accuracy, precision, recall, f1, time
+            scores = np.array(
+                [(r.accuracy, r.precision, r.recall, r.f1_score, r.extraction_time)
+                 for r in model_results if not r.errors],
+                dtype=np.float64
+            ).reshape(-1, 5)
+            successful = scores.shape[0]
+            means = scores.mean(axis=0).tolist() if successful else [0] * 5
             
             report["summary"][model] = {
                 "total_cvs": len(model_results),
-                "successful_extractions": len([r for r in model_results if not r.errors]),
-                "failed_extractions": len([r for r in model_results if r.errors]),
-                "avg_accuracy": sum(accuracies) / len(accuracies) if accuracies else 0,
-                "avg_precision": sum(precisions) / len(precisions) if precisions else 0,
-                "avg_recall": sum(recalls) / len(recalls) if recalls else 0,
-                "avg_f1_score": sum(f1_scores) / len(f1_scores) if f1_scores else 0,
-                "avg_extraction_time": sum(times) / len(times) if times else 0
+                "successful_extractions": successful,
+                "failed_extractions": len(model_results) - successful,
+                "avg_accuracy": means[0],
+                "avg_precision": means[1],
+                "avg_recall": means[2],
+                "avg_f1_score": means[3],
+                "avg_extraction_time": means[4]
             }
         
         # Model comparison
@@ -165,8 +215,7 @@ class CVEvaluator:
         # Convert dataclasses to dict for JSON serialization
         serializable_report = self._make_serializable(report)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(serializable_report, f, indent=2, ensure_ascii=False)
+        atomic_write_json(output_path, serializable_report, pretty=Config.PRETTY_JSON)
         
         print(f"Evaluation report saved to: {output_path}")
     
@@ -2,8 +2,11 @@
 Evaluation metrics for CV extraction
 """
 
-from typing import Dict, Any, Set, List
-import re
+import logging
+import sys
+from typing import Dict, Any, FrozenSet
+
+logger = logging.getLogger(__name__)
 
 
 class EvaluationMetrics:
@@ -22,27 +25,76 @@ class EvaluationMetrics:
         """Normalize text for comparison."""
         if not text:
             return ""
-        return re.sub(r'\s+', ' ', str(text).lower().strip())
+        return " ".join(str(text).lower().split())
     
-    def extract_text_fields(self, data: Dict[str, Any]) -> Set[str]:
-        """Extract all text fields from data for comparison."""
+    def extract_text_fields(self, data: Dict[str, Any], max_leaves: int = 20000,
+                            max_depth: int = 20) -> FrozenSet[str]:
+        """
+        Extract all text fields from data for comparison.
+        Stops after max_leaves values and skips anything nested deeper than max_depth,
+        so a malformed extraction cannot stall an evaluation run.
+        """
         fields = set()
+        stack = [("", data, 0)]
+        leaves = 0
+        truncated = False
         
-        def extract_recursive(obj, prefix=""):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    new_prefix = f"{prefix}.{key}" if prefix else key
-                    extract_recursive(value, new_prefix)
-            elif isinstance(obj, list):
-                for i, item in enumerate(obj):
-                    extract_recursive(item, f"{prefix}[{i}]")
+        while stack:
+            prefix, obj, depth = stack.pop()
+            if isinstance(obj, (dict, list)):
+                if depth > max_depth:
+                    truncated = True
+                    continue
+                if isinstance(obj, dict):
+                    for key, value in obj.items():
+                        stack.append((f"{prefix}.{key}" if prefix else key, value, depth + 1))
+                else:
+                    for i, item in enumerate(obj):
+                        stack.append((f"{prefix}[{i}]", item, depth + 1))
             elif obj is not None:
+                if leaves >= max_leaves:
+                    truncated = True
+                    break
+                leaves += 1
                 normalized = self.normalize_text(str(obj))
                 if normalized:
-                    fields.add(f"{prefix}:{normalized}")
+                    fields.add(sys.intern(f"{prefix}:{normalized}"))
+        
+        if truncated:
+            logger.warning(
+                "Text field extraction truncated (max_leaves=%d, max_depth=%d); scores are a lower bound",
+                max_leaves, max_depth
+            )
+        
+        return frozenset(fields)
+    
+    def field_sets(self, data: Dict[str, Any]) -> Dict[str, FrozenSet[str]]:
+        """Extract text fields per top-level key; their union equals extract_text_fields(data)."""
+        return {key: self.extract_text_fields({key: value}) for key, value in data.items()}
+    
+    def score_field_sets(self, extracted_sets: Dict[str, FrozenSet[str]],
+                         gt_sets: Dict[str, FrozenSet[str]]) -> Dict[str, Any]:
+        """Calculate accuracy, precision, recall and per-field accuracy from field_sets() output."""
+        field_accuracy = {}
+        for field in self.field_weights:
+            if field not in gt_sets:
+                field_accuracy[field] = 1.0 if field not in extracted_sets else 0.0
+            elif field not in extracted_sets:
+                field_accuracy[field] = 0.0
+            elif not gt_sets[field]:
+                field_accuracy[field] = 1.0 if not extracted_sets[field] else 0.0
+            else:
+                field_accuracy[field] = len(extracted_sets[field].intersection(gt_sets[field])) / len(gt_sets[field])
+        
+        extracted_fields = frozenset().union(*extracted_sets.values())
+        gt_fields = frozenset().union(*gt_sets.values())
         
-        extract_recursive(data)
-        return fields
+        return {
+            "accuracy": sum(field_accuracy[field] * weight for field, weight in self.field_weights.items()),
+            "precision": self._precision_sets(extracted_fields, gt_fields),
+            "recall": self._recall_sets(extracted_fields, gt_fields),
+            "field_accuracy": field_accuracy
+        }
     
     def calculate_field_accuracy(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any], field: str) -> float:
         """Calculate accuracy for a specific field."""
@@ -73,20 +125,24 @@ class EvaluationMetrics:
     
     def calculate_precision(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any]) -> float:
         """Calculate precision (correct extractions / total extractions)."""
-        extracted_fields = self.extract_text_fields(extracted)
-        gt_fields = self.extract_text_fields(ground_truth)
-        
+        return self._precision_sets(self.extract_text_fields(extracted), self.extract_text_fields(ground_truth))
+    
+    def calculate_recall(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any]) -> float:
+        """Calculate recall (correct extractions / total ground truth)."""
+        return self._recall_sets(self.extract_text_fields(extracted), self.extract_text_fields(ground_truth))
+    
+    @staticmethod
+    def _precision_sets(extracted_fields: FrozenSet[str], gt_fields: FrozenSet[str]) -> float:
+        """Precision from pre-extracted field sets."""
         if not extracted_fields:
             return 1.0 if not gt_fields else 0.0
         
         correct = extracted_fields.intersection(gt_fields)
         return len(correct) / len(extracted_fields)
     
-    def calculate_recall(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any]) -> float:
-        """Calculate recall (correct extractions / total ground truth)."""
-        extracted_fields = self.extract_text_fields(extracted)
-        gt_fields = self.extract_text_fields(ground_truth)
-        
+    @staticmethod
+    def _recall_sets(extracted_fields: FrozenSet[str], gt_fields: FrozenSet[str]) -> float:
+        """Recall from pre-extracted field sets."""
         if not gt_fields:
             return 1.0
         
@@ -125,19 +181,16 @@ class EvaluationMetrics:
     
     def calculate_detailed_metrics(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate detailed metrics for comprehensive evaluation."""
+        # Traverse each document once for every score
+        scores = self.score_field_sets(self.field_sets(extracted), self.field_sets(ground_truth))
+        
         return {
             "overall": {
-                "accuracy": self.calculate_accuracy(extracted, ground_truth),
-                "precision": self.calculate_precision(extracted, ground_truth),
-                "recall": self.calculate_recall(extracted, ground_truth),
-                "f1_score": self.calculate_f1_score(
-                    self.calculate_precision(extracted, ground_truth),
-                    self.calculate_recall(extracted, ground_truth)
-                )
-            },
-            "field_accuracy": {
-                field: self.calculate_field_accuracy(extracted, ground_truth, field)
-                for field in self.field_weights.keys()
+                "accuracy": scores["accuracy"],
+                "precision": scores["precision"],
+                "recall": scores["recall"],
+                "f1_score": self.calculate_f1_score(scores["precision"], scores["recall"])
             },
+            "field_accuracy": scores["field_accuracy"],
             "field_completeness": self.calculate_field_completeness(extracted, ground_truth)
         }
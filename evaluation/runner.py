@@ -4,8 +4,12 @@ import re
 import shutil
 import random
 from pathlib import Path
+from app.sessions import SessionStore
 from evaluation.core import CVEvaluator, main
 
+# CV number in an uploaded file name, e.g. "cv12" in "<uuid>_cv12.pdf"
+_CV_NUMBER_RE = re.compile(r'cv(\d+)')
+
 def prepare_ground_truth():
     """Prepare a consolidated ground truth file from individual files"""
     ground_truth_dir = Path("data/ground_truth")
@@ -43,33 +47,26 @@ def prepare_ground_truth():
 
 def find_pdf_to_gt_mapping():
     """Find mapping between PDF IDs and ground truth IDs"""
-    results_dir = Path("data/results")
-    session_files = list(results_dir.glob("*_session.json"))
+    store = SessionStore(Path("data/results"))
     
     mapping = {}
     
-    for session_file in session_files:
-        try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-                
+    try:
+        for uuid, session_data in store.iter_sessions():
             pdf_path = session_data.get("pdf_path", "")
             if pdf_path:
-                # Extract UUID and possibly CV number from the PDF filename
+                # Try to extract CV number from the PDF filename
                 pdf_filename = os.path.basename(pdf_path)
-                
-                # First, get the UUID
-                uuid = session_file.stem.split('_')[0]
-                
-                # Then try to extract CV number from the PDF filename
-                cv_number_match = re.search(r'cv(\d+)', pdf_filename.lower())
+                cv_number_match = _CV_NUMBER_RE.search(pdf_filename.lower())
                 if cv_number_match:
                     cv_number = cv_number_match.group(1)
                     gt_id = f"gt{cv_number}"
                     mapping[uuid] = gt_id
                     print(f"Mapped UUID {uuid} to ground truth ID {gt_id}")
-        except Exception as e:
-            print(f"Error processing {session_file}: {e}")
+    except Exception as e:
+        print(f"Error reading sessions: {e}")
+    finally:
+        store.close()
     
     return mapping
 
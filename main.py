@@ -4,6 +4,7 @@ CV Extractor - Main Entry Point
 Professional AI-powered CV/Resume data extraction tool
 """
 
+import os
 import sys
 import argparse
 from pathlib import Path
@@ -11,45 +12,49 @@ from pathlib import Path
 # Add current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from web.app import create_app
-from app.pipeline import CVExtractionPipeline
+# Only the light config module is imported up front; each command imports
+# its own dependencies (Flask, the PDF/LLM pipeline) when it runs
 from app.config import Config
 
 
-def run_web_app():
+def run_web_app(args=None):
     """Run the web application."""
+    from web.app import create_app, serve
+    
     app = create_app()
-    print(f"🚀 Starting CV Extractor Web Application")
-    print(f"📍 Server: http://{Config.HOST}:{Config.PORT}")
-    print(f"🔧 Debug mode: {Config.DEBUG}")
     
-    app.run(
-        host=Config.HOST,
-        port=Config.PORT,
-        debug=Config.DEBUG
-    )
+    # The debug reloader re-runs this in a child process; only announce once
+    if os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        print(f"🚀 Starting CV Extractor Web Application")
+        print(f"📍 Server: http://{Config.HOST}:{Config.PORT}")
+        print(f"🔧 Debug mode: {Config.DEBUG}")
+    
+    serve(app)
 
 
 def run_cli(args):
     """Run CLI processing."""
-    pipeline = CVExtractionPipeline()
+    from app.pipeline import get_pipeline
+    from app.utils import dumps_json
+    
+    pipeline = get_pipeline()
     
     if args.input:
         print(f"🔄 Processing file: {args.input}")
         result = pipeline.process_file(args.input, model=args.model)
         
+        # Encoded once with orjson when available (stdlib json otherwise)
+        output = dumps_json(result)
+        
         if args.output:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                import json
-                json.dump(result, f, indent=2, ensure_ascii=False)
+            Path(args.output).write_bytes(output)
             print(f"✅ Results saved to: {args.output}")
         else:
-            import json
             print("\n📄 Extraction Results:")
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print(output.decode('utf-8'))
 
 
-def run_evaluation():
+def run_evaluation(args=None):
     """Run evaluation."""
     try:
         from scripts.run_evaluation import main as eval_main
@@ -58,7 +63,7 @@ def run_evaluation():
         print("❌ Evaluation module not found. Please check scripts/run_evaluation.py")
 
 
-def run_tests():
+def run_tests(args=None):
     """Run tests."""
     try:
         from scripts.run_tests import main as test_main
@@ -67,8 +72,28 @@ def run_tests():
         print("❌ Test module not found. Please check scripts/run_tests.py")
 
 
+def add_cli_arguments(parser):
+    """Arguments of the cli command."""
+    parser.add_argument('--input', '-i', required=True, help='Input PDF file path')
+    parser.add_argument('--output', '-o', help='Output JSON file path')
+    parser.add_argument('--model', '-m', default='llama3', 
+                        choices=['llama3', 'mistral', 'phi', 'gemini'],
+                        help='AI model to use')
+
+
+# Command name -> (help text, argument setup or None, handler taking the parsed args)
+COMMANDS = {
+    'web': ('Run web application', None, run_web_app),
+    'cli': ('Run CLI processing', add_cli_arguments, run_cli),
+    'eval': ('Run evaluation', None, run_evaluation),
+    'test': ('Run tests', None, run_tests),
+}
+
+
 def main():
     """Main entry point."""
+    Config.configure_logging()
+    
     parser = argparse.ArgumentParser(
         description="CV Extractor - AI-powered resume processing",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -83,36 +108,20 @@ Examples:
     )
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
-    
-    # Web app command
-    web_parser = subparsers.add_parser('web', help='Run web application')
-    
-    # CLI command
-    cli_parser = subparsers.add_parser('cli', help='Run CLI processing')
-    cli_parser.add_argument('--input', '-i', required=True, help='Input PDF file path')
-    cli_parser.add_argument('--output', '-o', help='Output JSON file path')
-    cli_parser.add_argument('--model', '-m', default='llama3', 
-                          choices=['llama3', 'mistral', 'phi', 'gemini'],
-                          help='AI model to use')
-    
-    # Evaluation command
-    eval_parser = subparsers.add_parser('eval', help='Run evaluation')
-    
-    # Test command
-    test_parser = subparsers.add_parser('test', help='Run tests')
+    for name, (help_text, add_arguments, _) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if add_arguments is not None:
+            add_arguments(command_parser)
     
     args = parser.parse_args()
     
-    if args.command == 'web':
-        run_web_app()
-    elif args.command == 'cli':
-        run_cli(args)
-    elif args.command == 'eval':
-        run_evaluation()
-    elif args.command == 'test':
-        run_tests()
-    else:
+    command = COMMANDS.get(args.command)
+    if command is None:
         parser.print_help()
+        return
+    
+    handler = command[2]
+    handler(args)
 
 
 if __name__ == "__main__":
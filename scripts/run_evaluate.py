@@ -4,36 +4,139 @@ Real CV Evaluation Script with Optimized Model Extraction
 Evaluates actual model performance using the existing app infrastructure
 """
 
+import os
 import sys
-import json
+import re
+import tempfile
 import time
 import argparse
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Any
 
+import numpy as np
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import from existing app infrastructure
-from app.pipeline import CVExtractionPipeline
+from app.pipeline import CVExtractionPipeline, get_pipeline, extract_text_worker
 from app.config import Config
 from app.models import CVInfoExtractor
+from app.cache import LLMResponseCache
+from app.utils import get_file_hash_cached, loads_json, dumps_json, prefetch_files
+
+
+# Header line that opens each CV section (matched at the start of a line)
+SECTION_HEADERS = {
+    'education': r'education|academic background|qualifications',
+    'experience': r'(?:work |professional )?experience|employment(?: history)?|work history',
+    'skills': r'(?:technical |key )?skills|competenc(?:e|ies)',
+    'languages': r'languages',
+}
+
+# Any header that ends the section before it
+_SECTION_END = '|'.join(SECTION_HEADERS.values()) + '|projects|certifications|interests|references|summary|profile'
+
+SECTION_PATTERNS = {
+    section: re.compile(
+        rf'^[ \t]*(?:{header})\b[^\n]{{0,40}}\n(.*?)(?=^[ \t]*(?:{_SECTION_END})\b[^\n]{{0,40}}$|\Z)',
+        re.IGNORECASE | re.MULTILINE | re.DOTALL
+    )
+    for section, header in SECTION_HEADERS.items()
+}
+
+# Short per-section prompts; each returns a JSON object with the listed key
+SECTION_PROMPTS = {
+    'personal_info': """Extract the candidate's contact details from the top of this CV. Return ONLY valid JSON:
+{"personal_info": {"name": "", "email": "", "phone": "", "address": ""}}
+
+CV Text:
+{cv_text}""",
+    'education': """Extract every education entry from this CV section exactly as written. Return ONLY valid JSON:
+{"education": [{"degree": "", "institution": "", "year": "", "description": ""}]}
+
+CV Section:
+{cv_text}""",
+    'experience': """Extract every job from this CV section exactly as written. Return ONLY valid JSON:
+{"experience": [{"job_title": "", "company": "", "duration": "", "description": ""}]}
+
+CV Section:
+{cv_text}""",
+    'skills': """List every skill mentioned in this CV section, preserving exact wording. Return ONLY valid JSON:
+{"skills": ["Skill 1", "Skill 2"]}
+
+CV Section:
+{cv_text}""",
+    'languages': """List every spoken language mentioned in this CV section. Return ONLY valid JSON:
+{"languages": ["Language 1", "Language 2"]}
+
+CV Section:
+{cv_text}""",
+}
+
+
+def extract_section_snippet(cv_text: str, section: str) -> str:
+    """Return the text under a section header (education, experience, skills, languages), or ''"""
+    match = SECTION_PATTERNS[section].search(cv_text)
+    return match.group(1).strip() if match else ""
+
+
+@lru_cache(maxsize=512)
+def _load_ground_truth_file(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a ground truth file; shared by every evaluator in the process until the file changes"""
+    with open(path, 'rb') as f:
+        return loads_json(f.read())
 
 
 class OptimizedCVEvaluator:
     """Optimized CV evaluator using existing app infrastructure"""
     
-    def __init__(self, ground_truth_dir: str):
+    # Bump whenever the section prompts or the evaluation-side output change so cached results are not
+    # reused; cache keys also include CVInfoExtractor.PROMPT_VERSION for changes to the extraction prompt
+    PROMPT_VERSION = "v2"
+    
+    # Characters of CV text searched for contact details when no section header precedes them
+    HEADER_CHARS = 1500
+    
+    def __init__(self, ground_truth_dir: str, use_cache: bool = True, sectional: bool = False):
         self.ground_truth_dir = Path(ground_truth_dir)
         self.config = Config()
         self.models = ["llama3", "mistral", "phi"]
+        self.sectional = sectional
+        
+        # Ground truth per CV as (raw, normalized), loaded once per run
+        self._gt_cache = {}
+        
+        # Extracted text per CV path, shared by every model evaluated on it
+        self._text_futures = {}
+        self._text_lock = threading.Lock()
         
-        # Initialize the pipeline and extractor from your app
-        self.pipeline = CVExtractionPipeline(self.config)
-        self.cv_extractor = CVInfoExtractor()
+        # Extraction results keyed by PDF content, model and prompt versions, aging out like LLM results
+        self.use_cache = use_cache
+        self.result_cache = (LLMResponseCache(self.config.DATA_DIR / "eval_cache", ttl=self.config.LLM_CACHE_TTL)
+                             if use_cache else None)
+        
+        # Initialize the pipeline and extractor from your app; without the cache every CV reaches a model
+        self.pipeline = get_pipeline() if use_cache else CVExtractionPipeline(use_cache=False)
+        self.cv_extractor = CVInfoExtractor(use_cache=use_cache)
+        
+        # Connect to the LLM backend and load its models while ground truth and PDFs are read
+        threading.Thread(target=self.pipeline.cv_processor.warmup, daemon=True).start()
         
         # Optimize the extraction prompt in your existing CVInfoExtractor
         self._optimize_extraction_prompts()
+        
+        # One extractor per section prompt; the section name keeps their cache entries apart
+        self.section_extractors = {}
+        if sectional:
+            for section, prompt in SECTION_PROMPTS.items():
+                extractor = CVInfoExtractor(use_cache=self.use_cache)
+                extractor.extraction_prompt = prompt
+                extractor.PROMPT_VERSION = f"{CVInfoExtractor.PROMPT_VERSION}-{section}"
+                self.section_extractors[section] = extractor
     
     def _optimize_extraction_prompts(self):
         """Optimize the extraction prompts for better accuracy"""
@@ -48,65 +151,87 @@ CRITICAL INSTRUCTIONS:
 5. Return ONLY valid JSON - no explanations or markdown
 
 REQUIRED JSON STRUCTURE:
-{{
-  "personal_info": {{
+{
+  "personal_info": {
     "name": "Full name as written on CV",
     "email": "Exact email address", 
     "phone": "Complete phone number with formatting",
     "address": "Full address if mentioned"
-  }},
+  },
   "skills": ["Every skill mentioned", "Include technical and soft skills", "Preserve exact wording"],
   "education": [
-    {{
+    {
       "degree": "Complete degree/qualification name",
       "institution": "Full institution name",
       "year": "Exact year or date range",
       "description": "Additional details"
-    }}
+    }
   ],
   "experience": [
-    {{
+    {
       "job_title": "Complete job title as written",
       "company": "Full company name",
       "duration": "Exact employment period",
       "description": "Key responsibilities and achievements"
-    }}
+    }
   ],
   "languages": ["Language 1", "Language 2"]
-}}
+}
 
 EXTRACT EVERYTHING. BE PRECISE. RETURN ONLY JSON.
 
 CV Text:
-{{cv_text}}"""
+{cv_text}"""
         
         # Replace the prompt in the existing extractor
         self.cv_extractor.extraction_prompt = optimized_prompt
     
-    def load_ground_truth(self, cv_name: str) -> Dict[str, Any]:
-        """Load ground truth data for a CV"""
+    def ground_truth_file(self, cv_name: str) -> Path:
+        """Path of a CV's ground truth file"""
         # Convert cv1 -> gt1, cv2 -> gt2, etc.
         if cv_name.startswith('cv'):
             gt_name = cv_name.replace('cv', 'gt')
         else:
             gt_name = f"gt{cv_name}"
         
-        gt_file = self.ground_truth_dir / f"{gt_name}.json"
-        if not gt_file.exists():
+        return self.ground_truth_dir / f"{gt_name}.json"
+    
+    def load_ground_truth(self, cv_name: str) -> Dict[str, Any]:
+        """Load ground truth data for a CV"""
+        gt_file = self.ground_truth_file(cv_name)
+        try:
+            mtime_ns = gt_file.stat().st_mtime_ns
+        except FileNotFoundError:
             raise FileNotFoundError(f"Ground truth not found: {gt_file}")
         
-        with open(gt_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _load_ground_truth_file(str(gt_file), mtime_ns)
     
     def extract_with_model(self, cv_path: str, model: str) -> Dict[str, Any]:
         """Extract CV data using your existing app pipeline"""
         try:
             print(f"🔗 Using real model: {model}")
             
-            # Use your existing pipeline to process the CV
-            start_time = time.time()
-            result = self.pipeline.process_file(cv_path, model)
-            extraction_time = time.time() - start_time
+            # Use your existing pipeline to process the CV, unless these exact PDF bytes were already extracted
+            cache_key = None
+            result = None
+            if self.result_cache is not None:
+                cache_key = self.get_result_cache_key(cv_path, model)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    # Report the time the original extraction took, not the cache lookup
+                    result, extraction_time = cached['result'], cached['extraction_time']
+                    print("📂 Using cached extraction")
+            
+            if result is None:
+                start_time = time.time()
+                cv_text = self.get_cv_text(cv_path)
+                if self.sectional:
+                    result = self.extract_sections(cv_text, model)
+                if result is None:
+                    result = self.pipeline.process_text(Path(cv_path).name, cv_text, model)
+                extraction_time = time.time() - start_time
+                if cache_key is not None and 'error' not in result:
+                    self.result_cache.set(cache_key, {'result': result, 'extraction_time': extraction_time})
             
             # Check if extraction was successful
             if 'error' in result:
@@ -125,6 +250,64 @@ CV Text:
             print(f"❌ Pipeline failed for {model}: {e}")
             return self._create_error_result(model, str(e), 0)
     
+    def _needs_extraction(self, cv_path: str, models: List[str]) -> bool:
+        """Whether any model still has to run on this CV (cached results need no text)"""
+        if self.result_cache is None:
+            return True
+        return any(self.result_cache.get(self.get_result_cache_key(cv_path, model)) is None for model in models)
+    
+    def get_cv_text(self, cv_path: str) -> str:
+        """Extract a CV's text once per run; concurrent callers for the same CV wait for the first"""
+        with self._text_lock:
+            future = self._text_futures.get(cv_path)
+            owner = future is None
+            if owner:
+                future = self._text_futures[cv_path] = Future()
+        
+        if owner:
+            try:
+                if not self.pipeline.is_supported_file(cv_path):
+                    raise ValueError(f"Unsupported file type: {Path(cv_path).suffix}")
+                future.set_result(self.pipeline.pdf_extractor.extract_text(cv_path))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+    
+    def extract_sections(self, cv_text: str, model: str) -> Dict[str, Any]:
+        """
+        Extract each CV section with its own short prompt, in parallel, and merge the results.
+        Returns None when no section header is found, so the caller can use the full-text prompt.
+        """
+        snippets = {section: extract_section_snippet(cv_text, section) for section in SECTION_HEADERS}
+        if not any(snippets.values()):
+            return None
+        
+        # Contact details sit above the first section
+        starts = [SECTION_PATTERNS[section].search(cv_text).start() for section, snippet in snippets.items() if snippet]
+        snippets['personal_info'] = cv_text[:min(min(starts), self.HEADER_CHARS)] or cv_text[:self.HEADER_CHARS]
+        
+        result = {"personal_info": {}, "education": [], "experience": [], "skills": [], "languages": []}
+        tasks = {section: snippet for section, snippet in snippets.items() if snippet}
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {section: executor.submit(self.section_extractors[section].extract_from_cv, snippet, model)
+                       for section, snippet in tasks.items()}
+            for section, future in futures.items():
+                section_result = future.result()
+                if "error" in section_result:
+                    return section_result
+                if section in section_result:
+                    result[section] = section_result[section]
+        
+        return result
+    
+    def get_result_cache_key(self, cv_path: str, model: str) -> str:
+        """Cache key for a CV's extraction: hash of the PDF bytes, model and prompt version"""
+        # The PDF is hashed once per run, not once per model
+        prompt_version = f"{CVInfoExtractor.PROMPT_VERSION}.{self.PROMPT_VERSION}"
+        if self.sectional:
+            prompt_version += "-sections"
+        return LLMResponseCache.make_key(f"{model}:{prompt_version}", get_file_hash_cached(cv_path))
+    
     def _convert_app_format_to_eval_format(self, app_result: Dict[str, Any]) -> Dict[str, Any]:
         """Convert your app's result format to evaluation format"""
         # Your app returns: personal_info, education, experience, skills, languages
@@ -155,77 +338,128 @@ CV Text:
             "_error": error
         }
     
+    # Weight of each field in the overall accuracy
+    FIELD_WEIGHTS = {
+        'Name': 0.15,
+        'Email': 0.10,
+        'Phone': 0.10,
+        'Skills': 0.25,
+        'Education': 0.20,
+        'Experience': 0.20
+    }
+    # The same weights as a fixed field order and vector, built once for every scoring call
+    _FIELDS = tuple(FIELD_WEIGHTS)
+    _WEIGHTS = np.array(list(FIELD_WEIGHTS.values()))
+    
+    # Fields compared as single normalized strings
+    STRING_FIELDS = ('Name', 'Email', 'Phone')
+    # Fields compared item by item, key by key
+    ITEM_FIELDS = ('Education', 'Experience')
+    
+    @staticmethod
+    def _normalize_value(value: Any) -> str:
+        """Normalize a single value for comparison"""
+        return str(value).strip().lower()
+    
+    def normalize_ground_truth(self, ground_truth: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize the ground-truth side of every scored field once, for reuse across models"""
+        gt_norm = {}
+        for field, value in ground_truth.items():
+            if field in self.STRING_FIELDS:
+                gt_norm[field] = self._normalize_value(value)
+            elif field == 'Skills':
+                gt_norm[field] = frozenset(sys.intern(skill.lower().strip()) for skill in value) if value else frozenset()
+            elif field in self.ITEM_FIELDS:
+                gt_norm[field] = [tuple((key, self._normalize_value(item[key])) for key in item) for item in value] if value else []
+        return gt_norm
+    
+    def load_normalized_ground_truth(self, cv_name: str) -> Dict[str, Any]:
+        """Load a CV's ground truth together with its normalized form (cached per CV)"""
+        cached = self._gt_cache.get(cv_name)
+        if cached is None:
+            ground_truth = self.load_ground_truth(cv_name)
+            cached = (ground_truth, self.normalize_ground_truth(ground_truth))
+            self._gt_cache[cv_name] = cached
+        return cached
+    
     def calculate_field_accuracy(self, extracted: Any, ground_truth: Any, field_name: str) -> float:
         """Calculate accuracy for a specific field"""
-        if field_name in ['Name', 'Email', 'Phone']:
+        gt_norm = self.normalize_ground_truth({field_name: ground_truth})
+        return self._field_accuracy_normalized(extracted, gt_norm.get(field_name), field_name)
+    
+    def _field_accuracy_normalized(self, extracted: Any, gt_norm: Any, field_name: str) -> float:
+        """Calculate accuracy for a specific field against its normalized ground truth"""
+        if field_name in self.STRING_FIELDS:
             # String fields - exact match
-            return 1.0 if str(extracted).strip().lower() == str(ground_truth).strip().lower() else 0.0
+            return 1.0 if self._normalize_value(extracted) == gt_norm else 0.0
         
         elif field_name == 'Skills':
             # List fields - Jaccard similarity
-            if not ground_truth or not extracted:
-                return 1.0 if not ground_truth and not extracted else 0.0
+            if not gt_norm or not extracted:
+                return 1.0 if not gt_norm and not extracted else 0.0
             
-            gt_skills = set(skill.lower().strip() for skill in ground_truth)
             ex_skills = set(skill.lower().strip() for skill in extracted)
             
-            if not gt_skills and not ex_skills:
-                return 1.0
-            
-            intersection = len(gt_skills.intersection(ex_skills))
-            union = len(gt_skills.union(ex_skills))
+            # |A ∪ B| = |A| + |B| - |A ∩ B|, so the union set is never built
+            intersection = len(gt_norm.intersection(ex_skills))
+            union = len(gt_norm) + len(ex_skills) - intersection
             return intersection / union if union > 0 else 0.0
         
-        elif field_name in ['Education', 'Experience']:
+        elif field_name in self.ITEM_FIELDS:
             # Complex list fields
-            if not ground_truth or not extracted:
-                return 1.0 if not ground_truth and not extracted else 0.0
+            if not gt_norm or not extracted:
+                return 1.0 if not gt_norm and not extracted else 0.0
             
-            if len(ground_truth) != len(extracted):
+            if len(gt_norm) != len(extracted):
                 return 0.5  # Partial credit for different lengths
             
             total_score = 0.0
-            for gt_item, ex_item in zip(ground_truth, extracted):
+            for gt_item, ex_item in zip(gt_norm, extracted):
                 item_score = 0.0
-                item_fields = 0
                 
-                for key in gt_item.keys():
-                    if key in ex_item:
-                        if str(gt_item[key]).strip().lower() == str(ex_item[key]).strip().lower():
-                            item_score += 1.0
-                    item_fields += 1
+                for key, gt_value in gt_item:
+                    if key in ex_item and gt_value == self._normalize_value(ex_item[key]):
+                        item_score += 1.0
                 
-                total_score += item_score / item_fields if item_fields > 0 else 0.0
+                total_score += item_score / len(gt_item) if gt_item else 0.0
             
-            return total_score / len(ground_truth)
+            return total_score / len(gt_norm)
         
         return 0.0
     
-    def calculate_overall_accuracy(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any]) -> float:
+    def calculate_overall_accuracy(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any],
+                                   gt_norm: Dict[str, Any] = None) -> float:
         """Calculate overall accuracy across all fields"""
-        field_weights = {
-            'Name': 0.15,
-            'Email': 0.10,
-            'Phone': 0.10,
-            'Skills': 0.25,
-            'Education': 0.20,
-            'Experience': 0.20
-        }
-        
-        total_weighted_score = 0.0
-        total_weight = 0.0
-        
-        for field, weight in field_weights.items():
-            if field in ground_truth:
-                accuracy = self.calculate_field_accuracy(
-                    extracted.get(field), 
-                    ground_truth.get(field), 
-                    field
-                )
-                total_weighted_score += accuracy * weight
-                total_weight += weight
-        
-        return total_weighted_score / total_weight if total_weight > 0 else 0.0
+        if gt_norm is None:
+            gt_norm = self.normalize_ground_truth(ground_truth)
+        return float(self.calculate_overall_accuracies([extracted], [gt_norm])[0])
+    
+    def calculate_overall_accuracies(self, extractions: List[Dict[str, Any]],
+                                     gt_norms: List[Dict[str, Any]]) -> np.ndarray:
+        """Overall accuracy of many extractions at once, each against its normalized ground truth"""
+        fields = self._FIELDS
+        scores = np.zeros((len(extractions), len(fields)))
+        
+        # Only fields present in a CV's ground truth count towards its score
+        present = np.array([[field in gt_norm for field in fields] for gt_norm in gt_norms], dtype=bool)
+        present = present.reshape(len(extractions), len(fields))
+        
+        for j, field in enumerate(fields):
+            if field in self.STRING_FIELDS:
+                # Exact string matches compared as whole columns
+                extracted = np.array([self._normalize_value(e.get(field)) for e in extractions], dtype=object)
+                expected = np.array([gt_norm.get(field) for gt_norm in gt_norms], dtype=object)
+                scores[:, j] = extracted == expected
+            else:
+                scores[:, j] = [
+                    self._field_accuracy_normalized(e.get(field), gt_norm.get(field), field) if has_field else 0.0
+                    for e, gt_norm, has_field in zip(extractions, gt_norms, present[:, j])
+                ]
+        
+        weights = present * self._WEIGHTS
+        total_weight = weights.sum(axis=1)
+        weighted_score = (scores * weights).sum(axis=1)
+        return np.divide(weighted_score, total_weight, out=np.zeros(len(extractions)), where=total_weight > 0)
     
     def evaluate_single_cv(self, cv_path: str, models: List[str] = None) -> Dict[str, Any]:
         """Evaluate a single CV with specified models"""
@@ -239,7 +473,7 @@ CV Text:
         
         # Load ground truth
         try:
-            ground_truth = self.load_ground_truth(cv_name)
+            ground_truth, gt_norm = self.load_normalized_ground_truth(cv_name)
         except FileNotFoundError as e:
             print(f"❌ {e}")
             return {"error": str(e)}
@@ -252,28 +486,35 @@ CV Text:
             # Extract with model
             extracted = self.extract_with_model(str(cv_path), model)
             
-            # Calculate accuracy
-            if '_error' not in extracted:
-                accuracy = self.calculate_overall_accuracy(extracted, ground_truth)
-                print(f"✅ {accuracy:.3f}")
+            results[model] = self._score_extraction(extracted, ground_truth, gt_norm)
+            if results[model]['error'] is None:
+                print(f"✅ {results[model]['accuracy']:.3f}")
             else:
-                accuracy = 0.0
                 print(f"❌ Error")
-            
-            results[model] = {
-                'accuracy': accuracy,
-                'extraction_time': extracted.get('_extraction_time', 0),
-                'extracted_data': extracted,
-                'error': extracted.get('_error')
-            }
         
         return {
             'cv_name': cv_name,
-            'ground_truth': ground_truth,
+            'gt_file': str(self.ground_truth_file(cv_name)),
             'results': results
         }
     
-    def evaluate_dataset(self, cv_dir: str, models: List[str] = None) -> Dict[str, Any]:
+    def _score_extraction(self, extracted: Dict[str, Any], ground_truth: Dict[str, Any],
+                          gt_norm: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Build the per-model result entry for one extraction"""
+        accuracy = self.calculate_overall_accuracy(extracted, ground_truth, gt_norm) if '_error' not in extracted else 0.0
+        return self._result_entry(extracted, accuracy)
+    
+    @staticmethod
+    def _result_entry(extracted: Dict[str, Any], accuracy: float) -> Dict[str, Any]:
+        """Per-model result entry for an extraction and its accuracy"""
+        return {
+            'accuracy': accuracy,
+            'extraction_time': extracted.get('_extraction_time', 0),
+            'extracted_data': extracted,
+            'error': extracted.get('_error')
+        }
+    
+    def evaluate_dataset(self, cv_dir: str, models: List[str] = None, workers: int = 8) -> Dict[str, Any]:
         """Evaluate entire dataset"""
         cv_dir = Path(cv_dir)
         
@@ -295,28 +536,78 @@ CV Text:
         all_results = {}
         model_stats = {model: {'total': 0, 'successful': 0, 'failed': 0, 'total_accuracy': 0.0, 'total_time': 0.0} for model in models}
         
-        for i, cv_file in enumerate(cv_files, 1):
-            print(f"[{i}/{len(cv_files)}]")
+        # Load ground truth up front; CVs without one are skipped before any extraction
+        ground_truths = {}
+        for cv_file in cv_files:
+            try:
+                ground_truths[cv_file.stem] = self.load_normalized_ground_truth(cv_file.stem)
+            except FileNotFoundError as e:
+                print(f"❌ {e}")
+        
+        # Every (CV, model) extraction is independent and waits on the LLM, so run them all concurrently
+        tasks = [(cv_file, model) for cv_file in cv_files if cv_file.stem in ground_truths for model in models]
+        
+        # Let the kernel read all PDFs into the page cache while the first extractions run
+        prefetch_files([str(cv_file) for cv_file in cv_files if cv_file.stem in ground_truths])
+        
+        # Parse PDFs in worker processes (CPU bound) while the threads below wait on the LLM;
+        # each extraction then only waits for its own CV's text
+        to_parse = [str(cv_file) for cv_file in cv_files
+                    if cv_file.stem in ground_truths and self._needs_extraction(str(cv_file), models)]
+        text_pool = ProcessPoolExecutor(max_workers=min(len(to_parse), os.cpu_count() or 1)) if to_parse else None
+        if text_pool is not None:
+            with self._text_lock:
+                for cv_path in to_parse:
+                    if cv_path not in self._text_futures:
+                        self._text_futures[cv_path] = text_pool.submit(extract_text_worker, cv_path)
+        
+        extractions = {}
+        try:
+            if tasks:
+                with ThreadPoolExecutor(max_workers=min(len(tasks), workers)) as executor:
+                    futures = {executor.submit(self.extract_with_model, str(cv_file), model): (cv_file.stem, model)
+                               for cv_file, model in tasks}
+                    for i, future in enumerate(as_completed(futures), 1):
+                        cv_name, model = futures[future]
+                        extractions[(cv_name, model)] = future.result()
+                        print(f"[{i}/{len(tasks)}] {cv_name} - {model} done")
+                print()
+        finally:
+            if text_pool is not None:
+                text_pool.shutdown(cancel_futures=True)
+        
+        # Score every successful extraction in one vectorized pass
+        scored = [key for key, extracted in extractions.items() if '_error' not in extracted]
+        accuracies = dict(zip(scored, self.calculate_overall_accuracies(
+            [extractions[key] for key in scored],
+            [ground_truths[cv_name][1] for cv_name, _ in scored]
+        ).tolist()))
+        
+        for cv_file in cv_files:
+            cv_name = cv_file.stem
+            if cv_name not in ground_truths:
+                continue
             
-            result = self.evaluate_single_cv(cv_file, models)
+            results = {model: self._result_entry(extractions[(cv_name, model)], accuracies.get((cv_name, model), 0.0))
+                       for model in models}
+            all_results[cv_name] = {
+                'cv_name': cv_name,
+                'gt_file': str(self.ground_truth_file(cv_name)),
+                'results': results
+            }
             
-            if 'error' not in result:
-                all_results[result['cv_name']] = result
+            # Update statistics
+            for model in models:
+                model_result = results[model]
+                stats = model_stats[model]
+                stats['total'] += 1
                 
-                # Update statistics
-                for model in models:
-                    model_result = result['results'][model]
-                    stats = model_stats[model]
-                    stats['total'] += 1
-                    
-                    if model_result['error'] is None:
-                        stats['successful'] += 1
-                        stats['total_accuracy'] += model_result['accuracy']
-                        stats['total_time'] += model_result['extraction_time']
-                    else:
-                        stats['failed'] += 1
-            
-            print()
+                if model_result['error'] is None:
+                    stats['successful'] += 1
+                    stats['total_accuracy'] += model_result['accuracy']
+                    stats['total_time'] += model_result['extraction_time']
+                else:
+                    stats['failed'] += 1
         
         # Calculate final statistics
         summary = {}
@@ -382,8 +673,28 @@ CV Text:
         output_path = Path(output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Written one CV at a time so the whole report is never encoded as a single string
+        fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b"{")
+                for i, (key, value) in enumerate(results.items()):
+                    f.write(b"," if i else b"")
+                    f.write(b"\n" + dumps_json(key) + b": ")
+                    if key == 'detailed_results' and isinstance(value, dict):
+                        f.write(b"{")
+                        for j, (cv_name, cv_result) in enumerate(value.items()):
+                            f.write(b"," if j else b"")
+                            f.write(b"\n" + dumps_json(cv_name) + b": ")
+                            f.write(dumps_json(cv_result, pretty=Config.PRETTY_JSON))
+                        f.write(b"\n}")
+                    else:
+                        f.write(dumps_json(value, pretty=Config.PRETTY_JSON))
+                f.write(b"\n}\n")
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         
         print(f"💾 Results saved to: {output_path}")
 
@@ -396,11 +707,16 @@ def main():
     parser.add_argument("--models", nargs="+", default=["llama3", "mistral", "phi"], help="Models to evaluate")
     parser.add_argument("--output", default="data/real_evaluation_results.json", help="Output file")
     parser.add_argument("--single-cv", help="Evaluate single CV file")
+    parser.add_argument("--workers", "--parallel", type=int, default=8, help="Extractions run concurrently")
+    parser.add_argument("--sectional", action="store_true",
+                        help="Send each CV section to the model with its own short prompt instead of the whole CV")
+    parser.add_argument("--no-cache", action="store_true", help="Re-run every extraction instead of reusing cached results")
     
     args = parser.parse_args()
     
     # Initialize evaluator
-    evaluator = OptimizedCVEvaluator(args.ground_truth_dir)
+    evaluator = OptimizedCVEvaluator(args.ground_truth_dir, use_cache=not args.no_cache,
+                                     sectional=args.sectional)
     
     try:
         if args.single_cv:
@@ -416,7 +732,7 @@ def main():
             
         else:
             # Evaluate entire dataset
-            results = evaluator.evaluate_dataset(args.cv_dir, args.models)
+            results = evaluator.evaluate_dataset(args.cv_dir, args.models, args.workers)
         
         # Save results
         evaluator.save_results(results, args.output)
@@ -3,6 +3,7 @@
 Run tests script for CV Extractor
 """
 
+import os
 import sys
 import unittest
 import argparse
@@ -45,19 +46,15 @@ def run_specific_tests(test_modules):
 
 def run_integration_tests():
     """Run integration tests."""
-    # Set integration test flag
-    import tests.test_pipeline
-    import tests.test_web
-    
-    tests.test_pipeline.TestPipelineIntegration.integration_test = True
-    tests.test_web.TestWebIntegration.integration_test = True
+    # Integration tests check this flag when they run
+    os.environ['CVX_INTEGRATION'] = '1'
     
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
     
-    # Add integration test classes
-    suite.addTests(loader.loadTestsFromTestCase(tests.test_pipeline.TestPipelineIntegration))
-    suite.addTests(loader.loadTestsFromTestCase(tests.test_web.TestWebIntegration))
+    # Add integration test classes (each name imports only its own module)
+    suite.addTests(loader.loadTestsFromName("tests.test_pipeline.TestPipelineIntegration"))
+    suite.addTests(loader.loadTestsFromName("tests.test_web.TestWebIntegration"))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
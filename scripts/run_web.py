@@ -3,31 +3,36 @@
 Run Web Application Script
 """
 
+import os
 import sys
+import argparse
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from web.app import create_app
+from web.app import create_app, serve
 from app.config import Config
 
 
 def main():
     """Run the web application."""
-    print("🚀 Starting CV Extractor Web Application")
-    print(f"📍 Server: http://{Config.HOST}:{Config.PORT}")
-    print(f"🔧 Debug mode: {Config.DEBUG}")
-    print("Press Ctrl+C to stop the server")
+    parser = argparse.ArgumentParser(description="Run the CV Extractor web application")
+    parser.add_argument("--threads", type=int, default=Config.WEB_THREADS,
+                        help="Request threads of the production server (ignored in debug mode)")
+    args = parser.parse_args()
+    
+    # The debug reloader re-runs this in a child process; only announce once
+    if os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        print("🚀 Starting CV Extractor Web Application")
+        print(f"📍 Server: http://{Config.HOST}:{Config.PORT}")
+        print(f"🔧 Debug mode: {Config.DEBUG}")
+        print("Press Ctrl+C to stop the server")
     
     app = create_app()
     
     try:
-        app.run(
-            host=Config.HOST,
-            port=Config.PORT,
-            debug=Config.DEBUG
-        )
+        serve(app, threads=args.threads)
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user")
     except Exception as e:
@@ -17,6 +17,28 @@ def install_package(package):
         print(f"❌ Failed to install {package}")
         return False
 
+def run_pip_in_process(args):
+    """Run pip inside this interpreter; returns its exit code, or None if pip's internals are unavailable"""
+    try:
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        return None
+    return pip_main(args)
+
+def install_packages(packages):
+    """Install packages with a single pip run so dependencies are resolved together"""
+    # Running pip in-process saves starting another interpreter; pip's internal
+    # API is not stable, so fall back to the usual subprocess if it moves
+    returncode = run_pip_in_process(["install", *packages])
+    if returncode is None:
+        returncode = subprocess.call([sys.executable, "-m", "pip", "install", *packages])
+    
+    if returncode == 0:
+        print(f"✅ Installed {', '.join(packages)}")
+        return True
+    print("❌ Batch install failed, installing packages one by one")
+    return all([install_package(package) for package in packages])
+
 def main():
     """Install packages for real model integration"""
     print("🚀 Setting up real model integration for CV evaluation")
@@ -25,8 +47,7 @@ def main():
     # Required packages for different model integrations
     packages = {
         "PDF Processing": [
-            "PyPDF2",
-            "pdfplumber"
+            "PyMuPDF"
         ],
         "Ollama Integration": [
             "ollama"
@@ -45,12 +66,13 @@ def main():
         ]
     }
     
-    print("📦 Installing packages...")
-    
     for category, package_list in packages.items():
-        print(f"\n🔧 {category}:")
-        for package in package_list:
-            install_package(package)
+        print(f"🔧 {category}: {', '.join(package_list)}")
+    all_packages = [package for package_list in packages.values() for package in package_list]
+    
+    print("\n📦 Installing packages...")
+    
+    install_packages(all_packages)
     
     print("\n" + "=" * 60)
     print("🎉 Setup complete!")
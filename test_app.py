@@ -25,7 +25,7 @@ def test_app_infrastructure():
     
     # Test CV extractor
     print("\n🤖 Testing CVInfoExtractor...")
-    extractor = CVInfoExtractor()
+    extractor = CVInfoExtractor(use_cache=False)
     
     # Check Ollama availability
     ollama_available = extractor.check_ollama_available()
@@ -43,7 +43,9 @@ def test_app_infrastructure():
     
     # Test pipeline
     print("\n🔄 Testing Pipeline...")
-    pipeline = CVExtractionPipeline(config)
+    # Without the result cache, so the sample CV really goes through a model and
+    # nothing is written to data/cache
+    pipeline = CVExtractionPipeline(config, use_cache=False)
     print("✅ Pipeline initialized")
     
     # Test with sample CV
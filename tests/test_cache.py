@@ -0,0 +1,65 @@
+"""
+Tests for the LLM response cache
+"""
+
+import unittest
+import tempfile
+
+from app.cache import LLMResponseCache
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """Test cases for the LLM response cache."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = LLMResponseCache(cache_dir=self.tmp_dir.name)
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.cache.close()
+        self.tmp_dir.cleanup()
+    
+    def test_key_depends_on_model_and_text(self):
+        """Test cache keys differ per model and text."""
+        key = self.cache.make_key("llama3", "cv text")
+        self.assertEqual(key, self.cache.make_key("llama3", "cv text"))
+        self.assertNotEqual(key, self.cache.make_key("phi", "cv text"))
+        self.assertNotEqual(key, self.cache.make_key("llama3", "other text"))
+    
+    def test_set_and_get(self):
+        """Test stored results are returned."""
+        key = self.cache.make_key("llama3", "cv text")
+        self.assertIsNone(self.cache.get(key))
+        
+        self.cache.set(key, {"skills": ["Python"]})
+        self.assertEqual(self.cache.get(key), {"skills": ["Python"]})
+    
+    def test_expired_entries_are_ignored(self):
+        """Test entries older than the TTL are treated as misses."""
+        key = self.cache.make_key("llama3", "cv text")
+        self.cache.set(key, {"skills": ["Python"]})
+        
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get(key))
+
+    
+    def test_expired_and_surplus_entries_are_deleted(self):
+        """Test writes prune expired rows and keep at most max_entries."""
+        self.cache.set("old", {"skills": ["COBOL"]})
+        with self.cache._db:
+            self.cache._db.execute("UPDATE responses SET ts = 0")
+        
+        self.cache.max_entries = 2
+        for key in ("a", "b", "c"):
+            self.cache.set(key, {"skills": [key]})
+        
+        keys = {row[0] for row in self.cache._db.execute("SELECT key FROM responses")}
+        self.assertEqual(len(keys), 2)
+        self.assertNotIn("old", keys)
+        self.assertEqual(self.cache.get("c"), {"skills": ["c"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
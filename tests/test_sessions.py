@@ -0,0 +1,75 @@
+"""
+Tests for the web session store
+"""
+
+import unittest
+import tempfile
+from pathlib import Path
+
+from app.sessions import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test cases for the session store."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.tmp_dir.name)
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.store.close()
+        self.tmp_dir.cleanup()
+    
+    def test_status_lifecycle(self):
+        """Test job status moves from pending to done when the session is saved."""
+        self.assertIsNone(self.store.get_status("abc"))
+        
+        self.store.set_status("abc", "pending")
+        self.assertEqual(self.store.get_status("abc"), {"status": "pending"})
+        self.assertIsNone(self.store.get("abc"))
+        
+        self.store.save("abc", {"pdf_path": "cv.pdf", "results": {"phi": {"Skills": ["Python"]}}})
+        self.assertEqual(self.store.get_status("abc"), {"status": "done"})
+        self.assertEqual(self.store.get("abc")["results"], {"phi": {"Skills": ["Python"]}})
+    
+    def test_error_status(self):
+        """Test job errors are recorded with their message."""
+        self.store.set_status("abc", "error", "OCR failed")
+        self.assertEqual(self.store.get_status("abc"), {"status": "error", "error": "OCR failed"})
+    
+    def test_sessions_persist_across_instances(self):
+        """Test saved sessions are readable from a new store."""
+        self.store.save("abc", {"pdf_path": "cv.pdf"})
+        
+        other = SessionStore(self.tmp_dir.name)
+        self.assertEqual(other.get("abc"), {"pdf_path": "cv.pdf"})
+        other.close()
+    
+    def test_legacy_session_files_are_imported(self):
+        """Test per-session JSON files from older versions move into the database."""
+        legacy_file = Path(self.tmp_dir.name) / "old_session.json"
+        legacy_file.write_text('{"pdf_path": "cv3.pdf", "result_files": {}}', encoding="utf-8")
+        self.store.save("new", {"pdf_path": "cv4.pdf"})
+        
+        other = SessionStore(self.tmp_dir.name)
+        self.assertFalse(legacy_file.exists())
+        self.assertEqual(other.get_status("old"), {"status": "done"})
+        self.assertEqual(dict(other.iter_sessions()), {
+            "old": {"pdf_path": "cv3.pdf", "result_files": {}},
+            "new": {"pdf_path": "cv4.pdf"},
+        })
+        other.close()
+    
+    def test_delete_older_than(self):
+        """Test stale sessions can be expired."""
+        self.store.save("abc", {"pdf_path": "cv.pdf"})
+        
+        self.assertEqual(self.store.delete_older_than(3600), 0)
+        self.assertEqual(self.store.delete_older_than(-1), 1)
+        self.assertIsNone(self.store.get("abc"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,34 +4,51 @@ CV Extractor Web Application
 Flask web interface for CV extraction and processing.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify, flash, session
+from flask import Flask, Request, Response, current_app, render_template, request, redirect, url_for, send_file, send_from_directory, jsonify, flash, session, stream_with_context
+import gzip
 import os
+import secrets
 import uuid
 import json
+import logging
 import sys
 import time
+from urllib.parse import quote
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
+import shutil
+import tempfile
 from pathlib import Path
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 from app.config import Config, ensure_directories
-from app.extractor import ExtractFromPDF
-from app.models import CVInfoExtractor
-from app.utils import validate_file, get_unique_filename, create_safe_filename
+from app.sessions import SessionStore
+from app.utils import validate_file, get_unique_filename, create_safe_filename, atomic_write_json, dumps_json, loads_json, get_file_hash, get_bytes_hash, is_valid_pdf, clean_temp_files, PDF_HEADER_WINDOW
+
+logger = logging.getLogger(__name__)
 
 
 def create_app(testing=False):
     """Application factory function."""
+    Config.configure_logging()
+    
     # Ensure directories exist
     ensure_directories()
     
     app = Flask(__name__, 
                template_folder='templates',
                static_folder='static')
+    app.request_class = UploadRequest
+    app.json = FastJSONProvider(app)
     
     # Disable caching for static files during development
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
     
+    # Let a fronting web server (nginx/Apache) stream files via X-Sendfile
+    app.use_x_sendfile = Config.USE_X_SENDFILE
+    
     if testing:
         app.config.update({
             'TESTING': True,
@@ -48,16 +65,272 @@ def create_app(testing=False):
     
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
     
+    # Let nginx serve uploaded PDFs from an internal location via X-Accel-Redirect
+    app.config['X_ACCEL_PREFIX'] = Config.X_ACCEL_PREFIX
+    
     # Register routes
     register_routes(app)
     register_error_handlers(app)
+    app.after_request(compress_response)
+    
+    # Pay the extractor import/setup cost at startup (shared copy-on-write by preforked workers)
+    if Config.PRELOAD and not testing:
+        get_pdf_extractor()
+        get_cv_extractor()
     
     return app
 
 
+# Chunk size for writing uploads to disk; large chunks keep the copy loop cheap
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds browsers may cache an uploaded PDF served by the viewer
+PDF_MAX_AGE = 24 * 3600
+
+# Text responses gzip-compressed for clients that accept it (PDFs are already compressed)
+COMPRESS_MIMETYPES = frozenset({'text/html', 'application/json'})
+COMPRESS_LEVEL = 4
+COMPRESS_MIN_SIZE = 500
+
+
+class UploadRequest(Request):
+    """Request that spools every uploaded file straight to disk in the upload folder."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Werkzeug keeps uploads under 500 KB in memory; PDFs are written to disk anyway,
+        # so spool them next to their final path and let save_upload link them in place
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        if not os.path.isdir(upload_folder):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return tempfile.NamedTemporaryFile('wb+', buffering=UPLOAD_CHUNK_SIZE, prefix='.upload-',
+                                           suffix='.part', dir=upload_folder)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider for jsonify and request.get_json backed by dumps_json/loads_json (orjson when installed)."""
+    
+    def dumps(self, obj, **kwargs):
+        try:
+            return dumps_json(obj, pretty=False).decode('utf-8')
+        except TypeError:
+            # Types only Flask's encoder knows (e.g. Decimal, dataclasses)
+            return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        return loads_json(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = dumps_json(obj, pretty=False)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def compress_response(response):
+    """Gzip HTML and JSON responses when the client accepts it."""
+    if (response.status_code != 200
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def save_upload(file, filepath):
+    """
+    Move an uploaded file to filepath, hard-linking the spooled copy instead of copying it.
+    Never overwrites: raises FileExistsError if filepath is already taken.
+    """
+    spooled_path = getattr(file.stream, 'name', None)
+    if isinstance(spooled_path, str):
+        try:
+            file.stream.flush()
+            os.link(spooled_path, filepath)
+            return
+        except FileExistsError:
+            raise
+        except OSError:
+            pass
+    with open(filepath, 'xb', buffering=UPLOAD_CHUNK_SIZE) as f:
+        file.save(f, buffer_size=UPLOAD_CHUNK_SIZE)
+
+
+def read_header(stream, size):
+    """Read up to size bytes from a stream, looping over short reads until EOF."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def write_json_file(path, data):
+    """Write compact JSON atomically so readers never see a half-written file."""
+    atomic_write_json(path, data)
+
+
+def read_json_file(path):
+    """Read and parse a JSON file."""
+    return loads_json(Path(path).read_bytes())
+
+
+# Session stores keyed by results folder (one SQLite database each)
+_session_stores = {}
+_session_stores_lock = threading.Lock()
+
+
+def get_session_store(results_folder):
+    """Return the shared session store for a results folder."""
+    with _session_stores_lock:
+        store = _session_stores.get(results_folder)
+        if store is None:
+            store = _session_stores[results_folder] = SessionStore(results_folder)
+            # Jobs run in this process's memory, so any still pending were cut off by a restart
+            interrupted = store.fail_pending('Processing was interrupted by a server restart')
+            if interrupted:
+                logger.warning("Marked %s interrupted job(s) as failed", interrupted)
+        return store
+
+
+# Background pool running upload extraction jobs (created on first upload)
+_job_executor = None
+_job_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """Return the shared background job pool."""
+    global _job_executor
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS,
+                                               thread_name_prefix='cv-job')
+        return _job_executor
+
+
+def write_job_status(results_folder, session_id, status, error=None):
+    """Record a job status: pending, done or error."""
+    get_session_store(results_folder).set_status(session_id, status, error)
+
+
+def read_job_status(results_folder, session_id):
+    """Read a job status, or None if the job is unknown."""
+    return get_session_store(results_folder).get_status(session_id)
+
+
+# Latest progress of running jobs in this process ({session_id: {'stage': ..., 'pct': ...}}),
+# pushed to /progress/<session_id> listeners; jobs are removed when they finish
+_job_progress = {}
+_job_progress_changed = threading.Condition()
+
+# Seconds between SSE heartbeats (and status re-checks) while a job makes no progress
+PROGRESS_HEARTBEAT = 15
+
+# Milliseconds the browser waits before reopening a progress stream the server ended
+PROGRESS_RETRY_MS = 3000
+
+
+def report_progress(session_id, stage, pct):
+    """Record a job's current stage and wake its progress listeners."""
+    with _job_progress_changed:
+        _job_progress[session_id] = {'stage': stage, 'pct': pct}
+        _job_progress_changed.notify_all()
+
+
+def finish_progress(session_id):
+    """Forget a finished job's progress; listeners then report its final status."""
+    with _job_progress_changed:
+        _job_progress.pop(session_id, None)
+        _job_progress_changed.notify_all()
+
+
+def progress_events(results_folder, session_id, heartbeat=PROGRESS_HEARTBEAT, max_age=None):
+    """
+    Server-Sent Events for a job: progress updates, then one final status event.
+    The stream ends after max_age seconds (default EXTRACTION_TIMEOUT) so it never pins a
+    request thread; the browser then reconnects after the `retry:` delay.
+    """
+    if max_age is None:
+        max_age = Config.EXTRACTION_TIMEOUT
+    deadline = time.monotonic() + max_age
+    
+    yield f"retry: {PROGRESS_RETRY_MS}\n\n"
+    last = None
+    while time.monotonic() < deadline:
+        status = read_job_status(results_folder, session_id)
+        if status is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Unknown session'})}\n\n"
+            return
+        if status['status'] != 'pending':
+            yield f"data: {json.dumps({'stage': status['status'], 'pct': 100, **status})}\n\n"
+            return
+        
+        with _job_progress_changed:
+            current = _job_progress.get(session_id)
+            if current == last:
+                _job_progress_changed.wait(max(0, min(heartbeat, deadline - time.monotonic())))
+                current = _job_progress.get(session_id)
+        
+        if current is not None and current != last:
+            yield f"data: {json.dumps(current)}\n\n"
+        else:
+            yield ": heartbeat\n\n"
+        last = current
+
+
+def run_extraction_job(filepath, models, session_id, original_filename, results_folder):
+    """Process an uploaded PDF and save its session (runs in the job pool)."""
+    try:
+        # Process PDF and extract info
+        results = process_pdf(filepath, models,
+                              progress=lambda stage, pct: report_progress(session_id, stage, pct),
+                              results_folder=results_folder)
+        report_progress(session_id, 'save', 95)
+        
+        # Transform the nested structure to flat structure expected by template.
+        # The session is the only copy of the results; downloads serialize from it
+        transformed_results = {model: transform_data_structure(data) for model, data in results.items()}
+        session_data = {
+            'pdf_path': filepath,
+            'results': transformed_results,
+            'original_filename': original_filename
+        }
+        
+        # Storing the session marks the job done
+        get_session_store(results_folder).save(session_id, session_data)
+        logger.info("Processing complete for session: %s", session_id)
+        
+    except Exception as e:
+        logger.error("Job error for session %s: %s", session_id, e)
+        write_job_status(results_folder, session_id, 'error', str(e))
+    finally:
+        finish_progress(session_id)
+
+
+# Allowed upload suffixes, with the leading dot os.path.splitext returns
+_ALLOWED_SUFFIXES = frozenset('.' + ext.lower().lstrip('.') for ext in Config.ALLOWED_EXTENSIONS)
+
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in _ALLOWED_SUFFIXES
 
 
 def register_routes(app):
@@ -95,6 +368,10 @@ def register_routes(app):
             flash('Only PDF files are allowed')
             return redirect(url_for('upload_page'))
         
+        if not is_valid_pdf(file.stream):
+            flash('The uploaded file is not a PDF')
+            return redirect(url_for('upload_page'))
+        
         # Get selected models - FIXED: handle both 'model' and 'models'
         selected_model = request.form.get('model')  # Single model from radio buttons
         if selected_model:
@@ -104,83 +381,114 @@ def register_routes(app):
             if not models:
                 models = ['phi']  # Default to phi if none selected
         
-        print(f"Selected models: {models}")
+        logger.debug("Selected models: %s", models)
         
-        # Save and process file
+        # Save file and queue processing in the background
         try:
-            unique_id = str(uuid.uuid4())
+            unique_id = secrets.token_urlsafe(16)
             safe_filename = create_safe_filename(file.filename)
             filename = f"{unique_id}_{safe_filename}"
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Process PDF and extract info
-            results = process_pdf(filepath, models)
+            save_upload(file, filepath)
             
-            # Save session and results
             session_id = unique_id
-            session_file = os.path.join(app.config['RESULTS_FOLDER'], f"{session_id}_session.json")
-            result_files = {}
-            
-            # Transform results to match template expectations
-            transformed_results = {}
-            for model, data in results.items():
-                # Transform the nested structure to flat structure expected by template
-                transformed_data = transform_data_structure(data)
-                transformed_results[model] = transformed_data
-                
-                # Save transformed data
-                result_file = os.path.join(app.config['RESULTS_FOLDER'], f"{session_id}_{model}_result.json")
-                with open(result_file, 'w', encoding='utf-8') as f:
-                    json.dump(transformed_data, f, indent=4, ensure_ascii=False)
-                result_files[model] = result_file
-            
-            session_data = {
-                'pdf_path': filepath,
-                'results': transformed_results,  # Use transformed results
-                'result_files': result_files,
-                'original_filename': file.filename
-            }
-            
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=4, ensure_ascii=False)
+            results_folder = app.config['RESULTS_FOLDER']
+            write_job_status(results_folder, session_id, 'pending')
+            get_job_executor().submit(run_extraction_job, filepath, models, session_id,
+                                      file.filename, results_folder)
             
-            print(f"Processing complete. Redirecting to results page with session: {session_id}")
+            logger.debug("Processing queued. Redirecting to results page with session: %s", session_id)
             return redirect(url_for('show_results', session_id=session_id))
             
         except Exception as e:
             flash(f'Error processing PDF: {str(e)}')
-            print(f"Upload error: {str(e)}")
+            logger.error("Upload error: %s", e)
             return redirect(url_for('upload_page'))
+    
+    @app.route('/process_stream', methods=['POST'])
+    def upload_stream():
+        """Handle a raw application/pdf upload streamed straight to disk"""
+        if request.mimetype != 'application/pdf':
+            return jsonify({'error': 'Expected an application/pdf request body'}), 415
+        
+        original_filename = request.args.get('filename') or request.headers.get('X-Filename') or 'upload.pdf'
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'File type not allowed'}), 400
+        
+        models = request.args.getlist('models') or [request.args.get('model', 'phi')]
+        
+        # Set while this request's upload file is only partly written
+        partial_file = None
+        try:
+            session_id = secrets.token_urlsafe(16)
+            filename = f"{session_id}_{create_safe_filename(original_filename)}"
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            
+            # The raw stream cannot seek back, so check the header before writing anything
+            head = read_header(request.stream, PDF_HEADER_WINDOW)
+            if not is_valid_pdf(head):
+                return jsonify({'error': 'Request body is not a PDF'}), 400
+            
+            # Exclusive create: a colliding session id fails instead of overwriting an upload
+            with open(filepath, 'xb', buffering=UPLOAD_CHUNK_SIZE) as f:
+                partial_file = filepath
+                f.write(head)
+                shutil.copyfileobj(request.stream, f, UPLOAD_CHUNK_SIZE)
+            partial_file = None
+            
+            results_folder = app.config['RESULTS_FOLDER']
+            write_job_status(results_folder, session_id, 'pending')
+            get_job_executor().submit(run_extraction_job, filepath, models, session_id,
+                                      original_filename, results_folder)
+            
+            return jsonify({
+                'session_id': session_id,
+                'status_url': url_for('api_status', session_id=session_id),
+                'results_url': url_for('show_results', session_id=session_id)
+            }), 202
+            
+        except Exception as e:
+            logger.error("Upload error: %s", e)
+            # e.g. the client disconnected mid-body: don't leave the truncated PDF behind
+            if partial_file is not None:
+                try:
+                    os.unlink(partial_file)
+                except OSError:
+                    pass
+            return jsonify({'error': str(e)}), 500
 
     @app.route('/results/<session_id>')
     def show_results(session_id):
         """Display extraction results"""
-        print(f"Loading results for session: {session_id}")
-        session_file = os.path.join(app.config['RESULTS_FOLDER'], f"{session_id}_session.json")
+        logger.debug("Loading results for session: %s", session_id)
+        session_data = get_session_store(app.config['RESULTS_FOLDER']).get(session_id)
         
-        if not os.path.exists(session_file):
-            flash('Session not found')
-            print(f"Session file not found: {session_file}")
+        if session_data is None:
+            status = read_job_status(app.config['RESULTS_FOLDER'], session_id)
+            
+            if status and status['status'] == 'pending':
+                return render_template('results/pending.html', session_id=session_id)
+            
+            if status and status['status'] == 'error':
+                flash(f"Error processing PDF: {status.get('error', 'Unknown error')}")
+            else:
+                flash('Session not found')
+                logger.debug("Session not found: %s", session_id)
             return redirect(url_for('upload_page'))
         
         try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-            
             pdf_path = session_data['pdf_path']
             results = session_data['results']
             original_filename = session_data.get('original_filename', 'Unknown')
             
-            print(f"Loaded results keys: {list(results.keys()) if results else 'No results'}")
-            
             # Generate URL for PDF viewing
             pdf_url = url_for('serve_pdf', session_id=session_id)
             
-            # DEBUG: Print results structure
-            if results:
-                for model, data in results.items():
-                    print(f"Model {model} data keys: {list(data.keys()) if data else 'No data'}")
+            # Log the results structure only when someone reads it
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Loaded results keys: %s", list(results) if results else 'No results')
+                for model, data in (results or {}).items():
+                    logger.debug("Model %s data keys: %s", model, list(data) if data else 'No data')
             
             return render_template('results/index.html',
                                  pdf_url=pdf_url, 
@@ -189,28 +497,39 @@ def register_routes(app):
                                  session_id=session_id)
         except Exception as e:
             flash(f'Error loading results: {str(e)}')
-            print(f"Results loading error: {str(e)}")
+            logger.error("Results loading error: %s", e)
             return redirect(url_for('upload_page'))
 
     @app.route('/pdf/<session_id>')
     def serve_pdf(session_id):
         """Serve the uploaded PDF for viewing"""
-        session_file = os.path.join(app.config['RESULTS_FOLDER'], f"{session_id}_session.json")
+        session_data = get_session_store(app.config['RESULTS_FOLDER']).get(session_id)
         
-        if not os.path.exists(session_file):
+        if session_data is None:
             return redirect(url_for('upload_page'))
         
         try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-            
             pdf_path = session_data['pdf_path']
             
-            if not os.path.exists(pdf_path):
-                flash('PDF file not found')
-                return redirect(url_for('upload_page'))
+            x_accel_prefix = app.config.get('X_ACCEL_PREFIX')
+            if x_accel_prefix:
+                # nginx streams the file itself (sendfile, ranges, ETag); the worker is free at once
+                response = Response(mimetype='application/pdf')
+                response.headers['X-Accel-Redirect'] = f"{x_accel_prefix.rstrip('/')}/{quote(os.path.basename(pdf_path))}"
+                response.headers['Cache-Control'] = f'private, max-age={PDF_MAX_AGE}, immutable'
+                return response
             
-            return send_file(pdf_path, mimetype='application/pdf')
+            # Conditional responses support Range/If-None-Match, so PDF viewers fetch only what they need
+            response = send_from_directory(app.config['UPLOAD_FOLDER'], os.path.basename(pdf_path),
+                                           mimetype='application/pdf', conditional=True, etag=True,
+                                           max_age=PDF_MAX_AGE)
+            # An uploaded PDF never changes, so browsers may reuse it without revalidating
+            response.headers['Cache-Control'] = f'private, max-age={PDF_MAX_AGE}, immutable'
+            return response
+        except NotFound:
+            # send_from_directory already stats the file, so no separate exists() check
+            flash('PDF file not found')
+            return redirect(url_for('upload_page'))
         except Exception as e:
             flash(f'Error serving PDF: {str(e)}')
             return redirect(url_for('upload_page'))
@@ -223,23 +542,31 @@ def register_routes(app):
         if not session_id:
             return redirect(url_for('upload_page'))
         
-        session_file = os.path.join(app.config['RESULTS_FOLDER'], f"{session_id}_session.json")
+        session_data = get_session_store(app.config['RESULTS_FOLDER']).get(session_id)
         
-        if not os.path.exists(session_file):
+        if session_data is None:
             return redirect(url_for('upload_page'))
         
         try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
+            download_name = f"cv_extraction_{model}.json"
             
-            result_file = session_data['result_files'].get(model)
+            # Sessions from older versions point at a per-model result file
+            result_file = session_data.get('result_files', {}).get(model)
+            if result_file:
+                try:
+                    return send_file(result_file, mimetype='application/json', 
+                                   download_name=download_name, as_attachment=True)
+                except FileNotFoundError:
+                    pass
             
-            if not result_file or not os.path.exists(result_file):
+            data = session_data.get('results', {}).get(model)
+            if data is None:
                 flash('Result file not found')
                 return redirect(url_for('upload_page'))
             
-            return send_file(result_file, mimetype='application/json', 
-                           download_name=f"cv_extraction_{model}.json", as_attachment=True)
+            # A plain (non-passthrough) response, so compress_response can gzip it
+            return Response(dumps_json(data), mimetype='application/json',
+                            headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
         except Exception as e:
             flash(f'Error downloading result: {str(e)}')
             return redirect(url_for('upload_page'))
@@ -258,34 +585,52 @@ def register_routes(app):
         if not allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed'}), 400
         
+        if not is_valid_pdf(file.stream):
+            return jsonify({'error': 'File is not a PDF'}), 400
+        
         # Get the selected model
         model = request.form.get('model', Config.DEFAULT_MODEL)
         models = [model]
         
         try:
-            # Save and process file
-            unique_id = str(uuid.uuid4())
-            safe_filename = create_safe_filename(file.filename)
-            filename = f"{unique_id}_{safe_filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Process PDF and extract info
-            results = process_pdf(filepath, models)
+            # The API returns results directly and never shows the PDF again,
+            # so the upload (bounded by MAX_CONTENT_LENGTH) is processed in memory
+            results = process_pdf(file.read(), models)
             
             return jsonify({'results': results})
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/status/<session_id>')
+    def api_status(session_id):
+        """Background job status endpoint"""
+        status = read_job_status(app.config['RESULTS_FOLDER'], session_id)
+        
+        if status is None:
+            return jsonify({'error': 'Unknown session'}), 404
+        
+        return jsonify(status), 202 if status['status'] == 'pending' else 200
 
+    @app.route('/progress/<session_id>')
+    def job_progress(session_id):
+        """Stream a background job's progress as Server-Sent Events"""
+        events = progress_events(app.config['RESULTS_FOLDER'], session_id)
+        return Response(stream_with_context(events), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
     @app.route('/api/health')
     def api_health():
         """Health check endpoint"""
-        return jsonify({
+        health = {
             'status': 'healthy',
             'version': '1.0.0',
             'models_available': list(Config.MODELS.keys())
-        })
+        }
+        # LLM cache counters, once an extraction has created the shared extractor
+        if _cv_extractor is not None:
+            health['llm_cache'] = dict(_cv_extractor.cache_stats)
+        return jsonify(health)
 
 
 def register_error_handlers(app):
@@ -332,7 +677,8 @@ def transform_data_structure(data):
     if not data:
         return {}
     
-    if 'error' in data:
+    # Errors and results already in the flat schema pass through untouched
+    if 'error' in data or 'Name' in data:
         return data
     
     transformed = {}
@@ -348,11 +694,18 @@ def transform_data_structure(data):
     # Fix descriptions - join single characters
     def fix_descriptions(items):
         for item in items:
-            for key in ['description', 'Description']:
-                if key in item and isinstance(item[key], list):
-                    # Join if all items are single characters
-                    if item[key] and all(len(str(x)) == 1 for x in item[key]):
-                        item[key] = ''.join(item[key])
+            for key in ('description', 'Description'):
+                chars = item.get(key)
+                if not isinstance(chars, list) or not chars:
+                    continue
+                # Join if all items are single characters: with no empty strings,
+                # the joined text is as long as the list exactly when each item is one char
+                try:
+                    joined = ''.join(chars)
+                except TypeError:
+                    continue
+                if len(joined) == len(chars) and '' not in chars:
+                    item[key] = joined
         return items
     
     transformed['Education'] = fix_descriptions(data.get('education', []))
@@ -365,19 +718,116 @@ def transform_data_structure(data):
     
     return transformed
 
-def process_pdf(pdf_path, models):
-    """Process the PDF and extract information using selected models"""
-    # Initialize PDF extractor
-    pdf_extractor = ExtractFromPDF(
-        poppler_path=Config.POPPLER_PATH,
-        api_key=Config.GOOGLE_API_KEY
-    )
-    
-    print(f"Processing PDF: {pdf_path}")
+# Extracted PDF text keyed by file content hash, so re-uploads skip OCR. It lives in this
+# folder under the app's RESULTS_FOLDER and entries older than the max age are pruned
+TEXT_CACHE_DIRNAME = ".text_cache"
+TEXT_CACHE_MAX_AGE_HOURS = 7 * 24
+
+
+def extract_text_cached(pdf_extractor, pdf_path, cache_dir):
+    """Extract text from a PDF (path or bytes), reusing the text of an identical earlier upload."""
+    cache_dir = Path(cache_dir)
+    in_memory = isinstance(pdf_path, (bytes, bytearray))
+    content_hash = get_bytes_hash(pdf_path) if in_memory else get_file_hash(pdf_path)
+    cache_file = cache_dir / f"{content_hash}.txt"
     
     try:
-        # Extract text from PDF
+        text = cache_file.read_text(encoding='utf-8')
+        logger.debug("Using cached text for: %s", 'upload' if in_memory else pdf_path)
+        return text
+    except OSError:
+        pass
+    
+    if in_memory:
+        text = pdf_extractor.extract_text_from_bytes(pdf_path)
+    else:
         text = pdf_extractor.extract_text(pdf_path)
+    
+    # Only keep usable text; OCR failures are reported as text and must be retried
+    if text and len(text.strip()) >= 10 and not text.startswith("Error extracting text"):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_name(f"{cache_file.name}.{uuid.uuid4().hex}.tmp")
+        temp_file.write_text(text, encoding='utf-8')
+        os.replace(temp_file, cache_file)
+        
+        # Only after a real extraction (seconds of work), so the directory scan is cheap by comparison
+        clean_temp_files(cache_dir, max_age_hours=TEXT_CACHE_MAX_AGE_HOURS)
+    
+    return text
+
+
+# Long-lived extractors shared by all requests (created, and their modules imported, on first use)
+_pdf_extractor = None
+_cv_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_pdf_extractor():
+    """Return the shared PDF extractor, configuring Gemini once."""
+    global _pdf_extractor
+    with _extractor_lock:
+        if _pdf_extractor is None:
+            # Imported here so page views and app startup don't load PyMuPDF
+            from app.extractor import ExtractFromPDF
+            
+            _pdf_extractor = ExtractFromPDF(
+                poppler_path=Config.POPPLER_PATH,
+                api_key=Config.GOOGLE_API_KEY
+            )
+        return _pdf_extractor
+
+
+def get_cv_extractor():
+    """Return the shared CV extractor, keeping its HTTP session and caches warm."""
+    global _cv_extractor
+    with _extractor_lock:
+        if _cv_extractor is None:
+            from app.models import CVInfoExtractor
+            
+            _cv_extractor = CVInfoExtractor()
+        return _cv_extractor
+
+
+def model_error_result(message):
+    """Placeholder result for a model that failed to produce one."""
+    return {
+        "error": message,
+        "personal_info": {
+            "name": "Processing Error",
+            "email": "",
+            "phone": "",
+            "address": ""
+        },
+        "education": [],
+        "experience": [],
+        "skills": ["Model processing failed"],
+        "languages": []
+    }
+
+
+def process_pdf(pdf_path, models, progress=None, results_folder=None):
+    """
+    Process the PDF (path, or bytes of an in-memory upload) and extract information using selected models.
+    `progress(stage, pct)` is called as text extraction and each model finish.
+    The text cache lives under results_folder (default: the current app's RESULTS_FOLDER).
+    """
+    if progress is None:
+        progress = lambda stage, pct: None
+    if results_folder is None:
+        results_folder = current_app.config['RESULTS_FOLDER']
+    # Shared PDF extractor
+    pdf_extractor = get_pdf_extractor()
+    
+    if isinstance(pdf_path, (bytes, bytearray)):
+        logger.info("Processing PDF upload (%d bytes)", len(pdf_path))
+    else:
+        logger.info("Processing PDF: %s", pdf_path)
+    
+    try:
+        # Extract text from PDF (cached by content hash)
+        progress('extract_text', 5)
+        text = extract_text_cached(pdf_extractor, pdf_path, Path(results_folder) / TEXT_CACHE_DIRNAME)
+        progress('extract_text', 20)
         
         if not text or len(text.strip()) < 10:
             return {
@@ -396,43 +846,50 @@ def process_pdf(pdf_path, models):
                 }
             }
         
-        print(f"Extracted text length: {len(text)} characters")
-        print(f"Text sample: {text[:200]}...")
+        logger.debug("Extracted text length: %d characters", len(text))
+        logger.debug("Text sample: %.200s...", text)
         
-        # Initialize CV extractor
-        cv_extractor = CVInfoExtractor()
+        # Shared CV extractor
+        cv_extractor = get_cv_extractor()
         
-        # Process with each model
+        # Process with each model concurrently; the calls are I/O bound
         results = {}
-        for model in models:
-            print(f"Processing with model: {model}")
+        pool = ThreadPoolExecutor(max_workers=max(len(models), 1))
+        try:
+            futures = {}
+            for model in models:
+                logger.debug("Processing with model: %s", model)
+                futures[pool.submit(cv_extractor.extract_from_cv, text, model=model)] = model
             
             try:
-                info = cv_extractor.extract_from_cv(text, model=model)
-                results[model] = info
-                print(f"Model {model} completed successfully")
-                print(f"Model {model} result keys: {list(info.keys()) if info else 'No info'}")
-                
-            except Exception as e:
-                print(f"Error with model {model}: {str(e)}")
-                results[model] = {
-                    "error": f"Model processing error: {str(e)}",
-                    "personal_info": {
-                        "name": "Processing Error",
-                        "email": "",
-                        "phone": "",
-                        "address": ""
-                    },
-                    "education": [],
-                    "experience": [],
-                    "skills": ["Model processing failed"],
-                    "languages": []
-                }
+                for future in as_completed(futures, timeout=Config.EXTRACTION_TIMEOUT):
+                    model = futures[future]
+                    try:
+                        info = future.result()
+                        results[model] = info
+                        logger.info("Model %s completed successfully", model)
+                        logger.debug("Model %s result keys: %s", model, list(info) if info else 'No info')
+                    
+                    except Exception as e:
+                        logger.error("Error with model %s: %s", model, e)
+                        results[model] = model_error_result(f"Model processing error: {str(e)}")
+                    progress(f"model:{model}", 20 + 70 * len(results) // len(models))
+            
+            except FuturesTimeoutError:
+                for model in futures.values():
+                    if model not in results:
+                        logger.warning("Model %s timed out after %ss", model, Config.EXTRACTION_TIMEOUT)
+                        results[model] = model_error_result(
+                            f"Model processing error: timed out after {Config.EXTRACTION_TIMEOUT}s")
+        finally:
+            # Don't wait for calls that overran the deadline
+            pool.shutdown(wait=False, cancel_futures=True)
         
-        return results
+        # Keep the selected model order for display
+        return {model: results[model] for model in models if model in results}
         
     except Exception as e:
-        print(f"PDF processing error: {str(e)}")
+        logger.error("PDF processing error: %s", e)
         return {
             "error": {
                 "error": f"PDF processing failed: {str(e)}",
@@ -450,9 +907,36 @@ def process_pdf(pdf_path, models):
         }
 
 
-# Create the Flask app instance
-app = create_app()
+def serve(app, threads=None):
+    """
+    Serve the app: waitress (threaded production WSGI server) when installed and not
+    in debug mode, otherwise Flask's development server.
+    """
+    if not Config.DEBUG:
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            logger.warning("⚠️ waitress is not installed, using the Flask development server")
+        else:
+            waitress_serve(app, host=Config.HOST, port=Config.PORT, threads=threads or Config.WEB_THREADS)
+            return
+    
+    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG, threaded=True)
+
+
+# Flask app instance for WSGI servers, created on first access so that
+# importing create_app (CLI, scripts, tests) doesn't build a second app
+_app = None
+
+
+def __getattr__(name):
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == '__main__':
-    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
\ No newline at end of file
+    serve(create_app())
\ No newline at end of file